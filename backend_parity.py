@@ -0,0 +1,129 @@
+"""
+Check that every query backend reproduces the pandas charts and metrics.
+
+Usage:
+    python backend_parity.py [--csv PATH] [--backend NAME ...] [--rtol X]
+
+Every `CHART_MAPPING` and `METRICS_MAPPING` output is computed with each
+backend for a set of filter selections and time resolutions, and compared
+with the pandas backend. Backends whose engine is not installed are
+skipped. The exit status is 1 if any output differs.
+"""
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from backends import BACKENDS, PandasBackend, get_backend
+from bucketing import RESOLUTIONS
+from cube import build_cube, chart_data, metrics_data
+from data_loader import CSV_PATH, load_data
+from export_artifacts import CHART_MAPPING, METRICS_MAPPING
+from filter_index import FilterIndex
+
+# Float sums may be reassociated by multi-threaded engines
+RTOL = 1e-9
+
+
+def selections(index):
+    """
+    Filter selections covering single filters, combinations, a date window and no match.
+
+    Args:
+        index (FilterIndex): Index over the cube.
+
+    Returns:
+        list: Keyword arguments for `FilterIndex.select`.
+    """
+    provinces = index.options('province')
+    types = index.options('type')
+    pieaces = index.options('pieaces')
+    dates = index.frame['date']
+    middle = dates.iloc[len(dates) // 2]
+    return [
+        {},
+        {"province": provinces[0]},
+        {"type_filter": types[-1]},
+        {"pieace": "Catfishes"},
+        {"pieace": pieaces[0], "province": provinces[-1]},
+        {"province": provinces[0], "type_filter": types[0], "start_date": middle},
+        {"start_date": dates.iloc[0], "end_date": middle},
+        {"pieace": "No such pieace"},
+    ]
+
+
+def compare(expected, actual, rtol=RTOL):
+    """
+    Return a description of how two outputs differ, or None if they match.
+    """
+    try:
+        if isinstance(expected, pd.DataFrame):
+            pd.testing.assert_frame_equal(expected, actual, check_exact=False, rtol=rtol)
+        elif not np.isclose(expected, actual, rtol=rtol, equal_nan=True):
+            return f"{expected!r} != {actual!r}"
+    except AssertionError as e:
+        return str(e).strip().splitlines()[0]
+    return None
+
+
+def check_parity(cube, backends, rtol=RTOL):
+    """
+    Compare the outputs of `backends` with pandas.
+
+    Args:
+        cube (pd.DataFrame): The aggregated cube.
+        backends (list): Backends to check.
+        rtol (float): Relative tolerance for measures.
+
+    Returns:
+        list: One message per mismatching output; empty if all match.
+    """
+    index = FilterIndex(cube)
+    reference = PandasBackend()
+    failures = []
+    for selection in selections(index):
+        selected = index.take(index.select(**selection))
+        for freq in [None, *RESOLUTIONS.values()]:
+            expected = chart_data(selected, freq=freq, backend=reference)
+            expected.update(metrics_data(selected, backend=reference))
+            for backend in backends:
+                actual = chart_data(selected, freq=freq, backend=backend)
+                actual.update(metrics_data(selected, backend=backend))
+                for name in [*CHART_MAPPING, *METRICS_MAPPING]:
+                    difference = compare(expected[name], actual[name], rtol)
+                    if difference:
+                        failures.append(f"{backend.name} {name} {selection} freq={freq}: {difference}")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the query backends with pandas.")
+    parser.add_argument("--csv", default=CSV_PATH, help="source CSV file")
+    parser.add_argument(
+        "--backend", action="append", choices=[name for name in BACKENDS if name != "pandas"],
+        help="backend to check (repeatable, default: all installed)",
+    )
+    parser.add_argument("--rtol", type=float, default=RTOL, help="relative tolerance for measures")
+    args = parser.parse_args(argv)
+
+    backends = []
+    for name in args.backend or [name for name in BACKENDS if name != "pandas"]:
+        try:
+            backends.append(get_backend(name))
+        except ImportError as e:
+            print(f"Skipping {name}: {e}")
+    if not backends:
+        print("No backend to compare.")
+        return 0
+
+    failures = check_parity(build_cube(load_data(args.csv)), backends, args.rtol)
+    for failure in failures:
+        print(failure)
+    checked = ", ".join(backend.name for backend in backends)
+    print(f"{len(failures)} mismatches between pandas and {checked}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,249 @@
+"""
+Query backends running the grouped passes behind the charts and metrics.
+
+Every backend takes the filtered cube and an aggregation plan (see
+`cube.plan_aggregations`) and returns the same pandas group frames, so the
+chart slicing in `cube.chart_data` is shared and the outputs are identical
+across engines. DuckDB and Polars are optional; they are only imported when
+their backend is created.
+
+Filtering stays on `filter_index.FilterIndex`: backends receive the selected
+cube cells, not filter expressions.
+"""
+import numpy as np
+import pandas as pd
+
+from cube import aggregate, totals
+from profiler import stage
+
+# Backend used when none is configured
+DEFAULT_BACKEND = "pandas"
+
+# `date` keys bucketed by a period frequency, as DuckDB `date_trunc` parts
+DUCKDB_UNITS = {"W": "week", "M": "month", "Q": "quarter", "Y": "year"}
+
+# The same buckets as Polars `dt.truncate` intervals
+POLARS_UNITS = {"W": "1w", "M": "1mo", "Q": "1q", "Y": "1y"}
+
+
+def _encode(cube, plan):
+    """
+    Select the columns a plan needs, with categories replaced by their codes.
+
+    Engines then group on small integers and the groups are decoded against
+    the cube's own categories, which keeps the pandas (category) sort order.
+    """
+    names = {name for grouping in plan for name in grouping}
+    columns = {}
+    if names & {"date", "month"}:
+        columns['date'] = cube['date'].to_numpy()
+    for name in sorted(names - {"date", "month"}):
+        columns[name] = cube[name].cat.codes.to_numpy()
+    for measures in plan.values():
+        for measure in measures:
+            columns[measure] = cube[measure].to_numpy()
+    return pd.DataFrame(columns)
+
+
+def _decode(columns, grouping, measures, cube):
+    """
+    Build the pandas group frame from engine output sorted by the grouping keys.
+
+    Args:
+        columns (dict): Arrays `key_0`, `key_1`, ... and one per measure.
+        grouping (tuple): Names of the grouping keys.
+        measures (list): Summed measures.
+        cube (pd.DataFrame): The cube that was aggregated, for the dtypes.
+
+    Returns:
+        pd.DataFrame: Measures indexed by the grouping keys, as `cube.aggregate` returns.
+    """
+    keys = [np.asarray(columns[f"key_{position}"]) for position in range(len(grouping))]
+    # pandas drops groups whose key is missing
+    keep = np.ones(len(keys[0]), dtype=bool)
+    for name, values in zip(grouping, keys):
+        keep &= (values >= 0) if name in cube and isinstance(cube[name].dtype, pd.CategoricalDtype) else ~pd.isna(values)
+
+    levels = []
+    for name, values in zip(grouping, keys):
+        values = values[keep]
+        if name in cube and isinstance(cube[name].dtype, pd.CategoricalDtype):
+            values = pd.Categorical.from_codes(values, dtype=cube[name].dtype)
+        else:
+            values = values.astype(cube['date'].dtype)
+        levels.append(pd.Index(values, name=name))
+    index = levels[0] if len(levels) == 1 else pd.MultiIndex.from_arrays(levels)
+    return pd.DataFrame(
+        {measure: np.asarray(columns[measure])[keep].astype(cube[measure].dtype) for measure in measures},
+        index=index,
+    )
+
+
+class QueryBackend:
+    """
+    Interface for the engines running the chart and metric aggregations.
+    """
+
+    name = None
+
+    def aggregate(self, cube, plan, freq=None, profile=None):
+        """
+        Run one grouped pass per grouping of a plan, see `cube.aggregate`.
+        """
+        raise NotImplementedError
+
+    def totals(self, cube, measures):
+        """
+        Sum each measure over the whole cube, see `cube.totals`.
+        """
+        raise NotImplementedError
+
+
+class PandasBackend(QueryBackend):
+    """
+    The in-process pandas implementation.
+    """
+
+    name = "pandas"
+
+    def aggregate(self, cube, plan, freq=None, profile=None):
+        return aggregate(cube, plan, freq, profile)
+
+    def totals(self, cube, measures):
+        return totals(cube, measures)
+
+
+class DuckDBBackend(QueryBackend):
+    """
+    Runs the grouped passes as SQL on DuckDB's multi-threaded engine.
+
+    The cube is scanned in place; nothing is loaded into a database.
+
+    Args:
+        threads (int): Worker threads for DuckDB; its default (all cores) if None.
+    """
+
+    name = "duckdb"
+
+    def __init__(self, threads=None):
+        # Imported here so the other backends work without DuckDB installed
+        import duckdb
+
+        self._connection = duckdb.connect()
+        if threads:
+            self._connection.execute(f"SET threads = {int(threads)}")
+
+    def _key_expression(self, name, freq):
+        if name == "month":
+            return "date_trunc('month', \"date\")"
+        if name == "date" and freq in DUCKDB_UNITS:
+            return f"date_trunc('{DUCKDB_UNITS[freq]}', \"date\")"
+        return f'"{name}"'
+
+    def aggregate(self, cube, plan, freq=None, profile=None):
+        # A cursor per call, as DuckDB connections are not shared between threads
+        cursor = self._connection.cursor()
+        cursor.register("cube", _encode(cube, plan))
+        try:
+            groups = {}
+            for grouping, measures in plan.items():
+                with stage(profile, f"aggregate:{'+'.join(grouping)}", rows=len(cube)):
+                    keys = [
+                        f"{self._key_expression(name, freq)} AS key_{position}"
+                        for position, name in enumerate(grouping)
+                    ]
+                    sums = [f'SUM("{measure}") AS "{measure}"' for measure in measures]
+                    positions = ", ".join(str(position + 1) for position in range(len(grouping)))
+                    result = cursor.execute(
+                        f"SELECT {', '.join(keys + sums)} FROM cube GROUP BY {positions} ORDER BY {positions}"
+                    ).fetchnumpy()
+                    groups[grouping] = _decode(result, grouping, measures, cube)
+            return groups
+        finally:
+            cursor.close()
+
+    def totals(self, cube, measures):
+        cursor = self._connection.cursor()
+        cursor.register("cube", cube[measures])
+        sums = [f'SUM("{measure}")' for measure in measures]
+        try:
+            row = cursor.execute(f"SELECT {', '.join(sums)} FROM cube").fetchone()
+        finally:
+            cursor.close()
+        # SUM over no rows is NULL in SQL and 0 in pandas
+        return {
+            measure: cube[measure].dtype.type(0 if value is None else value)
+            for measure, value in zip(measures, row)
+        }
+
+
+class PolarsBackend(QueryBackend):
+    """
+    Runs the grouped passes on Polars' multi-threaded engine.
+    """
+
+    name = "polars"
+
+    def __init__(self):
+        # Imported here so the other backends work without Polars installed
+        import polars
+
+        self._pl = polars
+
+    def _key_expression(self, name, freq):
+        pl = self._pl
+        if name == "month":
+            return pl.col('date').dt.truncate("1mo")
+        if name == "date" and freq in POLARS_UNITS:
+            return pl.col('date').dt.truncate(POLARS_UNITS[freq])
+        return pl.col(name)
+
+    def aggregate(self, cube, plan, freq=None, profile=None):
+        pl = self._pl
+        frame = pl.from_pandas(_encode(cube, plan))
+        groups = {}
+        for grouping, measures in plan.items():
+            with stage(profile, f"aggregate:{'+'.join(grouping)}", rows=len(cube)):
+                keys = [f"key_{position}" for position in range(len(grouping))]
+                result = (
+                    frame.group_by([
+                        self._key_expression(name, freq).alias(key) for name, key in zip(grouping, keys)
+                    ])
+                    .agg([pl.col(measure).sum() for measure in measures])
+                    .sort(keys)
+                )
+                groups[grouping] = _decode(
+                    {column: result.get_column(column).to_numpy() for column in result.columns},
+                    grouping, measures, cube,
+                )
+        return groups
+
+    def totals(self, cube, measures):
+        row = self._pl.from_pandas(cube[measures]).sum().row(0)
+        return {measure: cube[measure].dtype.type(value or 0) for measure, value in zip(measures, row)}
+
+
+BACKENDS = {
+    PandasBackend.name: PandasBackend,
+    DuckDBBackend.name: DuckDBBackend,
+    PolarsBackend.name: PolarsBackend,
+}
+
+
+def get_backend(name=DEFAULT_BACKEND):
+    """
+    Create a query backend by name.
+
+    Args:
+        name (str): One of `BACKENDS`.
+
+    Returns:
+        QueryBackend: The backend.
+
+    Raises:
+        ValueError: If the name is unknown.
+        ImportError: If the engine behind the backend is not installed.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown query backend {name!r}, expected one of {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
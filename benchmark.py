@@ -0,0 +1,254 @@
+"""
+Benchmarks of the load, filter, chart and export paths on synthetic data.
+
+Usage:
+    python benchmark.py [--sizes N ...] [--repeat N] [--backend NAME]
+                        [--results PATH] [--label NAME] [--fail-on-regression]
+
+For every size a synthetic CSV is generated once under `data/synthetic`
+and reused by later runs. Each stage is then timed `--repeat` times:
+parsing the CSV, loading the Parquet sidecar, building the cube and the
+filter index, the dashboard filter selections, every grouped pass and
+chart, the metrics and the artifact export.
+
+Results are appended to a JSON lines file, one record per size and stage,
+labelled with the current git commit. Every run is compared with the most
+recent run of another label, so regressions show up between versions.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from backends import BACKENDS, DEFAULT_BACKEND, get_backend
+from cube import build_cube, chart_data, metrics_data
+from data_loader import load_data, sidecar_path
+from export_artifacts import build_artifacts, write_json_atomic
+from filter_index import FilterIndex
+from profiler import RerunProfile
+from synthetic_data import generate_csv
+
+# Sizes run by default; larger ones (up to 100M rows) are opt-in through --sizes
+SIZES = [10_000, 100_000, 1_000_000]
+
+DATA_DIR = os.path.join("data", "synthetic")
+RESULTS_PATH = os.path.join("benchmarks", "results.jsonl")
+
+# A stage this many times slower than in the baseline run is reported as a regression
+REGRESSION_RATIO = 1.25
+
+# Stages shorter than this in both runs are too noisy to compare
+MIN_SECONDS = 0.005
+
+
+def current_label():
+    """
+    Label results with the short hash of the checked-out commit.
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def filter_selections(index):
+    """
+    Filter states a dashboard session typically goes through.
+    """
+    dates = index.frame['date']
+    middle = dates.iloc[len(dates) // 2]
+    province = index.options('province')[0]
+    return {
+        "all": {},
+        "province": {"province": province},
+        "province_type": {"province": province, "type_filter": index.options('type')[0]},
+        "pieace_window": {"pieace": "Catfishes", "start_date": dates.iloc[0], "end_date": middle},
+    }
+
+
+def run_once(csv_path, backend, out_dir):
+    """
+    Time every stage once.
+
+    Args:
+        csv_path (str): Synthetic CSV to benchmark on.
+        backend (QueryBackend): Engine for the aggregations.
+        out_dir (str): Directory the artifacts are exported to.
+
+    Returns:
+        RerunProfile: One stage per timed step.
+    """
+    profile = RerunProfile()
+
+    # Parsing writes the sidecar the next stage reads
+    if os.path.exists(sidecar_path(csv_path)):
+        os.remove(sidecar_path(csv_path))
+    with profile.stage("parse") as stage:
+        stage["rows"] = len(load_data(csv_path))
+    with profile.stage("load") as stage:
+        df = load_data(csv_path)
+        stage["rows"] = len(df)
+
+    with profile.stage("cube", rows=len(df)):
+        cube = build_cube(df)
+    with profile.stage("index", rows=len(cube)):
+        index = FilterIndex(cube)
+
+    for name, selection in filter_selections(index).items():
+        with profile.stage(f"filter:{name}") as stage:
+            selected = index.take(index.select(**selection))
+            stage["rows"] = len(selected)
+
+    chart_data(cube, profile=profile, backend=backend)
+    with profile.stage("compute:metrics", rows=len(cube)):
+        metrics_data(cube, backend=backend)
+
+    with profile.stage("export:build", rows=len(cube)):
+        artifacts = build_artifacts(cube, backend)
+    with profile.stage("export:write") as stage:
+        for name, payload in artifacts.items():
+            write_json_atomic(payload, os.path.join(out_dir, name))
+        stage["rows"] = len(artifacts)
+    return profile
+
+
+def benchmark_size(rows, repeat=3, backend=None, data_dir=DATA_DIR):
+    """
+    Benchmark one dataset size.
+
+    Args:
+        rows (int): Rows of the synthetic dataset.
+        repeat (int): Times each stage is run.
+        backend (QueryBackend): Engine for the aggregations; pandas if None.
+        data_dir (str): Where the synthetic CSVs are kept.
+
+    Returns:
+        list: One dict per stage with the median and best seconds and the row count.
+    """
+    csv_path = os.path.join(data_dir, f"fishery_{rows}.csv")
+    if not os.path.exists(csv_path):
+        generate_csv(csv_path, rows)
+
+    backend = backend or get_backend()
+    samples = {}
+    with tempfile.TemporaryDirectory() as out_dir:
+        for _ in range(repeat):
+            for record in run_once(csv_path, backend, out_dir).stages:
+                samples.setdefault(record["stage"], []).append(record)
+    return [
+        {
+            "stage": stage,
+            "median_seconds": statistics.median(record["seconds"] for record in records),
+            "best_seconds": min(record["seconds"] for record in records),
+            "rows": records[0]["rows"],
+        }
+        for stage, records in samples.items()
+    ]
+
+
+def read_results(path=RESULTS_PATH):
+    """
+    Read every stored benchmark record.
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path) as results_file:
+        return [json.loads(line) for line in results_file if line.strip()]
+
+
+def append_results(records, path=RESULTS_PATH):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "a") as results_file:
+        for record in records:
+            results_file.write(json.dumps(record) + "\n")
+
+
+def baseline(history, record):
+    """
+    Return the latest stored record of the same size, stage and backend from another label.
+    """
+    for previous in reversed(history):
+        if (
+            previous["label"] != record["label"]
+            and previous["size"] == record["size"]
+            and previous["stage"] == record["stage"]
+            and previous.get("backend") == record["backend"]
+        ):
+            return previous
+    return None
+
+
+def regressions(history, records, ratio=REGRESSION_RATIO):
+    """
+    Compare new records with their baselines.
+
+    Args:
+        history (list): Previously stored records.
+        records (list): Records of this run.
+        ratio (float): Slowdown reported as a regression.
+
+    Returns:
+        list: (record, baseline record, slowdown) for every regressed stage.
+    """
+    found = []
+    for record in records:
+        previous = baseline(history, record)
+        if previous is None or max(previous["median_seconds"], record["median_seconds"]) < MIN_SECONDS:
+            continue
+        slowdown = record["median_seconds"] / max(previous["median_seconds"], 1e-9)
+        if slowdown >= ratio:
+            found.append((record, previous, slowdown))
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard computations on synthetic data.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="dataset sizes in rows")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage; the median is reported")
+    parser.add_argument("--backend", choices=list(BACKENDS), default=DEFAULT_BACKEND, help="query backend")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="directory of the synthetic CSVs")
+    parser.add_argument("--results", default=RESULTS_PATH, help="JSON lines file the results are appended to")
+    parser.add_argument("--label", default=None, help="name of this run (default: the git commit)")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit with status 1 on a regression")
+    args = parser.parse_args(argv)
+
+    label = args.label or current_label()
+    backend = get_backend(args.backend)
+    history = read_results(args.results)
+    timestamp = time.time()
+
+    found = []
+    for rows in args.sizes:
+        records = [
+            {"label": label, "timestamp": timestamp, "backend": args.backend, "size": rows, **result}
+            for result in benchmark_size(rows, args.repeat, backend, args.data_dir)
+        ]
+        append_results(records, args.results)
+
+        print(f"\n{rows:,} rows ({args.backend}, {label})")
+        for record in records:
+            previous = baseline(history, record)
+            change = ""
+            if previous:
+                change = f"  {record['median_seconds'] / max(previous['median_seconds'], 1e-9):.2f}x vs {previous['label']}"
+            print(f"  {record['stage']:<45} {record['median_seconds'] * 1000:>10.1f} ms{change}")
+        found.extend(regressions(history, records))
+
+    for record, previous, slowdown in found:
+        print(
+            f"Regression: {record['stage']} at {record['size']:,} rows is {slowdown:.2f}x slower "
+            f"than {previous['label']}"
+        )
+    return 1 if found and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
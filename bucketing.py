@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+
+# Time resolutions offered by the dashboard, as pandas period frequencies
+RESOLUTIONS = {
+    "Day": "D",
+    "Week": "W",
+    "Month": "M",
+    "Quarter": "Q",
+    "Year": "Y",
+}
+
+# Points a time-series chart may ship to the browser
+MAX_CHART_POINTS = 200
+
+
+def bucket_count(start_date, end_date, freq):
+    """
+    Number of `freq` buckets spanned by an inclusive date range.
+    """
+    return (pd.Period(end_date, freq) - pd.Period(start_date, freq)).n + 1
+
+
+def choose_bucket(start_date, end_date, max_points=MAX_CHART_POINTS):
+    """
+    Pick the finest resolution that keeps a date range within the point budget.
+
+    Args:
+        start_date: First date of the range.
+        end_date: Last date of the range.
+        max_points (int): Maximum number of points per series.
+
+    Returns:
+        str: A period frequency from `RESOLUTIONS`.
+    """
+    for freq in RESOLUTIONS.values():
+        if bucket_count(start_date, end_date, freq) <= max_points:
+            return freq
+    return RESOLUTIONS["Year"]
+
+
+def bucket_dates(dates, freq):
+    """
+    Map each date to the start of its `freq` bucket; daily dates are kept as is.
+
+    Args:
+        dates (pd.Series): Datetime values.
+        freq (str): A period frequency, or None for no bucketing.
+
+    Returns:
+        pd.Series: The bucket start dates, named `date`.
+    """
+    if freq is None or freq == "D":
+        return dates.rename('date')
+    return dates.dt.to_period(freq).dt.start_time.astype(dates.dtype).rename('date')
+
+
+def lttb_indices(x, y, threshold):
+    """
+    Select points with the Largest-Triangle-Three-Buckets algorithm.
+
+    The first and last points are always kept; every bucket in between
+    contributes the point forming the largest triangle with the previously
+    selected point and the mean of the next bucket, which preserves peaks
+    and troughs.
+
+    Args:
+        x (np.ndarray): Increasing x values.
+        y (np.ndarray): Values to preserve the shape of.
+        threshold (int): Number of points to keep.
+
+    Returns:
+        np.ndarray: Sorted positions of the selected points.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+
+    selected = np.empty(threshold, dtype=np.intp)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        next_start, next_stop = stop, edges[bucket + 2] if bucket + 2 < len(edges) else n
+        mean_x = x[next_start:next_stop].mean()
+        mean_y = y[next_start:next_stop].mean()
+        areas = np.abs(
+            (x[previous] - mean_x) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (mean_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def downsample(frame, measures, threshold=MAX_CHART_POINTS, x='date'):
+    """
+    Reduce a time series to about `threshold` points while keeping its shape.
+
+    With several measures, the points selected for any of them are kept,
+    so every line stays faithful on the shared x axis.
+
+    Args:
+        frame (pd.DataFrame): Series sorted by `x`.
+        measures (list): Columns whose shape should be preserved.
+        threshold (int): Points to keep per measure.
+        x (str): Name of the x column.
+
+    Returns:
+        pd.DataFrame: The selected rows.
+    """
+    if len(frame) <= threshold:
+        return frame
+    positions = frame[x].to_numpy().astype("datetime64[ns]").astype("int64")
+    keep = np.unique(np.concatenate([
+        lttb_indices(positions, frame[measure].to_numpy(), threshold) for measure in measures
+    ]))
+    return frame.iloc[keep].reset_index(drop=True)
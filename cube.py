@@ -0,0 +1,305 @@
+import pandas as pd
+
+from bucketing import bucket_dates
+from derived import base_measures, derive
+from profiler import stage
+
+# Dimensions the dashboard filters on; one cube row per distinct combination
+CUBE_KEYS = ["province", "type", "pieaces", "date"]
+
+# Additive measures, summed per cube cell
+CUBE_MEASURES = [
+    "total_quant_of_product",
+    "total_value_product",
+    "total_emp",
+    "export_value",
+    "import_value",
+    "net_trade_value",
+]
+
+
+def _as_category(values):
+    """
+    Convert a dimension column to a categorical whose categories follow first appearance.
+    """
+    strings = values.astype(str)
+    return pd.Series(pd.Categorical(strings, categories=pd.unique(strings)), index=values.index, name=values.name)
+
+
+def build_cube(df):
+    """
+    Pre-aggregate the raw rows into one row per (province, type, pieaces, date).
+
+    Besides the summed measures, each cell keeps the raw row count. Ratios
+    and shares are derived from the sums after aggregation, see `derived`.
+
+    Args:
+        df (pd.DataFrame): The raw fishery data.
+
+    Returns:
+        pd.DataFrame: The aggregated cube.
+    """
+    grouped = df.groupby(CUBE_KEYS, observed=True, sort=False)
+    cube = grouped[CUBE_MEASURES].sum()
+    cube['row_count'] = grouped.size()
+    cube = cube.reset_index()
+    for column in CUBE_KEYS:
+        if column != 'date':
+            cube[column] = _as_category(cube[column])
+    return cube
+
+
+def combine_cubes(cubes):
+    """
+    Re-aggregate several partial cubes, e.g. one per chunk of a large file.
+
+    Args:
+        cubes (list): Cubes built with `build_cube` over disjoint rows.
+
+    Returns:
+        pd.DataFrame: A single cube, cells in order of first appearance.
+    """
+    combined = pd.concat(cubes, ignore_index=True)
+    for column in CUBE_KEYS:
+        if column != 'date':
+            combined[column] = _as_category(combined[column])
+    return combined.groupby(CUBE_KEYS, observed=True, sort=False).sum().reset_index()
+
+
+def merge_cubes(cube, delta):
+    """
+    Add the cells of `delta` into `cube`.
+
+    Cells present in both have their measures and counts summed; cells only
+    in `delta` are appended. Only the touched cells are updated, the raw rows
+    behind `cube` are never revisited.
+
+    Args:
+        cube (pd.DataFrame): The existing cube.
+        delta (pd.DataFrame): A cube built from new rows.
+
+    Returns:
+        pd.DataFrame: The merged cube.
+    """
+    values = [column for column in delta.columns if column not in CUBE_KEYS]
+    positions = pd.MultiIndex.from_frame(cube[CUBE_KEYS].astype(str)).get_indexer(
+        pd.MultiIndex.from_frame(delta[CUBE_KEYS].astype(str))
+    )
+    matched = positions >= 0
+
+    merged = cube.copy()
+    columns = [merged.columns.get_loc(column) for column in values]
+    merged.iloc[positions[matched], columns] = (
+        merged.iloc[positions[matched], columns].to_numpy() + delta.loc[matched, values].to_numpy()
+    )
+
+    merged = pd.concat([merged, delta[~matched]], ignore_index=True)
+    for column in CUBE_KEYS:
+        if column != 'date':
+            merged[column] = _as_category(merged[column])
+    return merged
+
+
+# Groupings and measures each chart is sliced from. Charts sharing a grouping
+# are served by one grouped pass over the cube, see `plan_aggregations`.
+# `date` is the (bucketed) date and `month` the calendar month.
+CHART_PLAN = {
+    "production_by_type": [(("type",), ["total_quant_of_product"])],
+    "value_by_type": [(("type",), ["total_value_product"])],
+    "production_over_time": [(("date",), ["total_quant_of_product"])],
+    "value_over_time": [(("date",), ["total_value_product"])],
+    "average_unit_value_over_time": [(("date", "pieaces"), base_measures(["unit_value"]))],
+    "top_production_provinces": [(("province",), ["total_quant_of_product"])],
+    "top_value_provinces": [(("province",), ["total_value_product"])],
+    "monthly_pieaces": [(("pieaces",), ["total_quant_of_product"]), (("month", "pieaces"), ["total_quant_of_product"])],
+    "monthly_provinces": [(("province",), ["total_quant_of_product"]), (("month", "province"), ["total_quant_of_product"])],
+    "export_import_over_time": [(("date",), ["export_value", "import_value"])],
+    "net_trade_over_time": [(("date",), ["net_trade_value"])],
+    "top_net_trade_provinces": [(("province",), ["net_trade_value"])],
+}
+
+
+def plan_aggregations(charts):
+    """
+    Collect the measures every requested chart needs, per grouping.
+
+    Args:
+        charts (list): Chart names from `CHART_PLAN`.
+
+    Returns:
+        dict: Measure lists keyed by grouping, in order of first use.
+    """
+    plan = {}
+    for name in charts:
+        for grouping, measures in CHART_PLAN[name]:
+            planned = plan.setdefault(grouping, [])
+            planned.extend(measure for measure in measures if measure not in planned)
+    return plan
+
+
+def aggregate(cube, plan, freq=None, profile=None):
+    """
+    Run one grouped pass over the cube per grouping of a plan.
+
+    The derived keys are computed once and shared by every grouping that
+    uses them.
+
+    Args:
+        cube (pd.DataFrame): The aggregated cube, already filtered.
+        plan (dict): Measure lists keyed by grouping, see `plan_aggregations`.
+        freq (str): Period frequency of the `date` key, see `bucketing.RESOLUTIONS`.
+        profile (RerunProfile): Records one `aggregate:<grouping>` stage per pass, if given.
+
+    Returns:
+        dict: Summed measures indexed by the grouping keys, keyed by grouping.
+    """
+    derived = {
+        "date": lambda: bucket_dates(cube['date'], freq),
+        "month": lambda: cube['date'].dt.to_period('M').dt.to_timestamp().rename('month'),
+    }
+    keys = {}
+
+    def key(name):
+        if name not in keys:
+            keys[name] = derived[name]() if name in derived else cube[name]
+        return keys[name]
+
+    groups = {}
+    for grouping, measures in plan.items():
+        with stage(profile, f"aggregate:{'+'.join(grouping)}", rows=len(cube)):
+            groups[grouping] = cube.groupby([key(name) for name in grouping], observed=True)[measures].sum()
+    return groups
+
+
+def _sum_by(groups, key, measure):
+    return groups[(key,)][measure].reset_index()
+
+
+def _over_time(groups, measures):
+    return groups[("date",)][measures].reset_index()
+
+
+def _top(groups, key, measure, n):
+    return groups[(key,)][measure].sort_values(ascending=False).reset_index().head(n)
+
+
+def _monthly_top(groups, key, n):
+    """
+    Monthly production of the `n` largest members of `key`.
+    """
+    top = groups[(key,)]['total_quant_of_product'].nlargest(n).index.tolist()
+    monthly = groups[("month", key)]['total_quant_of_product']
+    return monthly[monthly.index.get_level_values(key).isin(top)].reset_index()
+
+
+def _average_unit_value(groups, pieace):
+    by_date = groups[("date", "pieaces")]
+    selected = by_date[by_date.index.get_level_values('pieaces') == pieace].droplevel('pieaces')
+    return derive(selected, ["unit_value"])[['unit_value']].reset_index()
+
+
+def chart_data(cube, freq=None, profile=None, charts=None, backend=None):
+    """
+    Compute the data behind every dashboard chart from a (filtered) cube.
+
+    The measures of all requested charts are gathered first, then the cube
+    is grouped once per grouping key and each chart takes its slice.
+
+    Args:
+        cube (pd.DataFrame): The aggregated cube, already filtered.
+        freq (str): Period frequency the over-time charts are bucketed by,
+            see `bucketing.RESOLUTIONS`; None keeps one point per date.
+        profile (RerunProfile): Records the grouped passes and one
+            `compute:<chart>` stage per chart, if given.
+        charts (list): Names of the charts to compute; all of `CHART_PLAN` if None.
+        backend: Query backend running the grouped passes, see `backends`;
+            pandas (`aggregate`) if None.
+
+    Returns:
+        dict: Chart data frames keyed like `CHART_MAPPING`.
+    """
+    charts = list(CHART_PLAN) if charts is None else charts
+    run = aggregate if backend is None else backend.aggregate
+    groups = run(cube, plan_aggregations(charts), freq, profile)
+    slicers = {
+        "production_by_type": lambda: _sum_by(groups, 'type', 'total_quant_of_product'),
+        "value_by_type": lambda: _sum_by(groups, 'type', 'total_value_product'),
+        "production_over_time": lambda: _over_time(groups, 'total_quant_of_product'),
+        "value_over_time": lambda: _over_time(groups, 'total_value_product'),
+        "average_unit_value_over_time": lambda: _average_unit_value(groups, "Catfishes"),
+        "top_production_provinces": lambda: _top(groups, 'province', 'total_quant_of_product', 5),
+        "top_value_provinces": lambda: _top(groups, 'province', 'total_value_product', 5),
+        "monthly_pieaces": lambda: _monthly_top(groups, 'pieaces', 3),
+        "monthly_provinces": lambda: _monthly_top(groups, 'province', 3),
+        "export_import_over_time": lambda: _over_time(groups, ['export_value', 'import_value']),
+        "net_trade_over_time": lambda: _over_time(groups, 'net_trade_value'),
+        "top_net_trade_provinces": lambda: _top(groups, 'province', 'net_trade_value', 5),
+    }
+    data = {}
+    for name in charts:
+        with stage(profile, f"compute:{name}", rows=len(cube)):
+            data[name] = slicers[name]()
+    return data
+
+
+def totals(cube, measures):
+    """
+    Sum each measure over the whole cube.
+
+    Returns:
+        dict: One total per measure.
+    """
+    return {measure: cube[measure].sum() for measure in measures}
+
+
+def metrics_data(cube, backend=None):
+    """
+    Compute the big-number metrics from a (filtered) cube.
+
+    Args:
+        cube (pd.DataFrame): The aggregated cube, already filtered.
+        backend: Query backend computing the totals, see `backends`; pandas if None.
+
+    Returns:
+        dict: Metric values keyed like `METRICS_MAPPING`, plus the raw record count.
+    """
+    sums = (totals if backend is None else backend.totals)(cube, [
+        'total_quant_of_product', 'total_value_product', 'total_emp', 'row_count',
+    ])
+    sums = derive(sums, ["unit_value"])
+    return {
+        "total_production": sums['total_quant_of_product'],
+        "total_value": sums['total_value_product'],
+        "average_unit_value": sums['unit_value'],
+        "total_employment": sums['total_emp'],
+        "record_count": int(sums['row_count']),
+    }
+
+
+def derived_metrics(cube, grouping, names, freq=None, backend=None):
+    """
+    Evaluate derived metrics for any grouping of a (filtered) cube.
+
+    The base measures are summed per group in one grouped pass, then every
+    ratio and share is computed from the sums.
+
+    Args:
+        cube (pd.DataFrame): The aggregated cube, already filtered.
+        grouping (tuple): Grouping keys, e.g. `("province",)` or `("date", "type")`.
+        names (list): Names from `derived.DERIVED_METRICS`.
+        freq (str): Period frequency of a `date` key, see `bucketing.RESOLUTIONS`.
+        backend: Query backend running the grouped pass, see `backends`; pandas if None.
+
+    Returns:
+        pd.DataFrame: One row per group with the base measures and the metrics.
+    """
+    run = aggregate if backend is None else backend.aggregate
+    groups = run(cube, {tuple(grouping): base_measures(names)}, freq)
+    return derive(groups[tuple(grouping)], names).reset_index()
+
+
+def production_by_province(cube):
+    """
+    Total production per province, as shown on the geomap.
+    """
+    return cube.groupby('province', observed=True)['total_quant_of_product'].sum().reset_index()
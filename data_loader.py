@@ -0,0 +1,211 @@
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from derived import DERIVED_METRICS
+
+# Conversion rate: 1 USD = 35 THB
+USD_TO_THB = 35
+
+CSV_PATH = "sample_data_fishery_thailand.csv"
+
+# Key under which the source CSV fingerprint is stored in the sidecar's schema metadata
+FINGERPRINT_KEY = b"fishery.source_fingerprint"
+
+# Columns of the source CSV, in file order
+SOURCE_COLUMNS = [
+    "total_quant_of_product",
+    "total_value_product",
+    "pieaces",
+    "total_emp",
+    "export_value",
+    "import_value",
+    "date",
+    "total_quant_species",
+    "province",
+    "type",
+    "unit_value",
+    "production_per_worker",
+    "value_per_worker",
+    "percent_share_of_total_production",
+    "percent_share_of_total_value",
+    "net_trade_value",
+]
+
+# Per-row ratios and shares are not loaded; they are derived after aggregation, see `derived`
+STORED_COLUMNS = [column for column in SOURCE_COLUMNS if column not in DERIVED_METRICS]
+
+CATEGORY_COLUMNS = ["province", "type", "pieaces"]
+
+# Additive measures stay float64 so large sums keep their precision;
+# the species count is never summed and fits comfortably in float32.
+FLOAT32_COLUMNS = [
+    "total_quant_species",
+]
+
+
+def sidecar_path(csv_path=CSV_PATH):
+    """
+    Return the path of the columnar sidecar for a source CSV.
+
+    Args:
+        csv_path (str): Path to the source CSV file.
+
+    Returns:
+        str: Path to the Parquet sidecar next to the CSV.
+    """
+    return os.path.splitext(csv_path)[0] + ".parquet"
+
+
+def source_fingerprint(csv_path=CSV_PATH):
+    """
+    Fingerprint the source CSV by size and modification time.
+
+    Args:
+        csv_path (str): Path to the source CSV file.
+
+    Returns:
+        str: A string that changes whenever the CSV is rewritten.
+    """
+    stat = os.stat(csv_path)
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+
+def prepare_frame(df):
+    """
+    Bring freshly read rows into the dashboard's compact in-memory layout.
+
+    Derived columns are dropped, the dimension columns become categoricals,
+    `FLOAT32_COLUMNS` are downcast and monetary values are converted from
+    1000 USD to THB.
+
+    Args:
+        df (pd.DataFrame): Rows as read from a source CSV, with parsed dates.
+
+    Returns:
+        pd.DataFrame: The converted rows, columns in `STORED_COLUMNS` order.
+    """
+    df = df[STORED_COLUMNS]
+    df[CATEGORY_COLUMNS] = df[CATEGORY_COLUMNS].astype("category")
+
+    # Convert values from 1000 USD to THB
+    df['total_value_product'] = df['total_value_product'] * 1000 * USD_TO_THB
+
+    df[FLOAT32_COLUMNS] = df[FLOAT32_COLUMNS].astype("float32")
+    return df
+
+
+def parse_csv(csv_path=CSV_PATH):
+    """
+    Parse the source CSV into the dashboard's compact in-memory layout.
+
+    Args:
+        csv_path (str): Path to the source CSV file.
+
+    Returns:
+        pd.DataFrame: The parsed fishery data.
+    """
+    df = pd.read_csv(
+        csv_path,
+        delimiter=",",
+        usecols=STORED_COLUMNS,
+        dtype={column: "category" for column in CATEGORY_COLUMNS},
+        parse_dates=["date"],
+    )
+    return prepare_frame(df)
+
+
+def _read_sidecar(path, fingerprint):
+    """
+    Read the sidecar if it was built from the given source fingerprint.
+
+    Returns:
+        pd.DataFrame or None: The cached frame, or None when missing or stale.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        schema = pq.read_schema(path)
+    except (OSError, pa.ArrowInvalid):
+        return None
+    if (schema.metadata or {}).get(FINGERPRINT_KEY) != fingerprint.encode():
+        return None
+    # Sidecars written before a column layout change are rebuilt
+    if schema.names != STORED_COLUMNS:
+        return None
+    return pd.read_parquet(path)
+
+
+def _write_sidecar(df, path, fingerprint):
+    """
+    Write the parsed frame to the sidecar, tagged with its source fingerprint.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[FINGERPRINT_KEY] = fingerprint.encode()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    pq.write_table(table.replace_schema_metadata(metadata), tmp_path)
+    os.replace(tmp_path, path)
+
+
+def write_arrow(df, path):
+    """
+    Write a frame to an uncompressed Arrow IPC file that can be memory-mapped.
+
+    Args:
+        df (pd.DataFrame): The frame to write.
+        path (str): Destination path; replaced atomically.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def map_arrow(path):
+    """
+    Memory-map an Arrow IPC file as a read-only DataFrame.
+
+    Numeric, date and categorical-code columns are views of the mapped
+    pages rather than copies, so every process mapping the same file shares
+    one copy of the data through the OS page cache.
+
+    Args:
+        path (str): File written by `write_arrow`.
+
+    Returns:
+        pd.DataFrame: The mapped frame.
+    """
+    return pa.ipc.open_file(pa.memory_map(path, "r")).read_all().to_pandas(split_blocks=True)
+
+
+def load_data(csv_path=CSV_PATH):
+    """
+    Load the fishery dataset, preferring the columnar sidecar.
+
+    The CSV is only parsed when the sidecar is missing or was built from
+    a different version of the CSV; the sidecar is then rebuilt.
+
+    Args:
+        csv_path (str): Path to the source CSV file.
+
+    Returns:
+        pd.DataFrame: The parsed fishery data.
+    """
+    fingerprint = source_fingerprint(csv_path)
+    path = sidecar_path(csv_path)
+
+    df = _read_sidecar(path, fingerprint)
+    if df is not None:
+        return df
+
+    df = parse_csv(csv_path)
+    try:
+        _write_sidecar(df, path, fingerprint)
+    except OSError as e:
+        # A read-only checkout still works, it just re-parses next time
+        print(f"Could not write data sidecar {path}: {e}")
+    return df
@@ -0,0 +1,108 @@
+"""
+Derived metrics, defined over the additive base measures.
+
+Ratios and shares are not stored per row: averaging per-row ratios weights
+every record equally, whatever its size, and goes wrong as soon as rows
+are filtered or grouped. Each metric is instead an expression over summed
+measures (quantity, value, employment), evaluated column-wise once the
+data has been aggregated to the grouping being shown.
+"""
+import numpy as np
+
+
+class Ratio:
+    """
+    `scale * numerator / denominator` of two summed measures; NaN where the denominator is 0.
+    """
+
+    def __init__(self, numerator, denominator, scale=1.0):
+        self.numerator = numerator
+        self.denominator = denominator
+        self.scale = scale
+
+    @property
+    def measures(self):
+        return [self.numerator, self.denominator]
+
+    def evaluate(self, values):
+        """
+        Args:
+            values: Aggregated frame, or dict of totals, holding `measures`.
+
+        Returns:
+            pd.Series or float: One value per row, or a single value for totals.
+        """
+        numerator = values[self.numerator]
+        denominator = values[self.denominator]
+        if np.ndim(denominator) == 0:
+            return self.scale * numerator / denominator if denominator else float("nan")
+        return self.scale * numerator / denominator.where(denominator != 0)
+
+
+class Share:
+    """
+    Percent of the total of a summed measure contributed by each row.
+    """
+
+    def __init__(self, measure):
+        self.measure = measure
+
+    @property
+    def measures(self):
+        return [self.measure]
+
+    def evaluate(self, values):
+        """
+        Args:
+            values: Aggregated frame, or dict of totals, holding `measures`.
+
+        Returns:
+            pd.Series or float: Percent per row, adding up to 100; 100 for totals.
+        """
+        return Ratio(self.measure, "total", 100.0).evaluate(
+            {self.measure: values[self.measure], "total": np.sum(values[self.measure])}
+        )
+
+
+# Metrics the source CSV ships per row, as expressions over the base measures
+DERIVED_METRICS = {
+    "unit_value": Ratio("total_value_product", "total_quant_of_product"),
+    "production_per_worker": Ratio("total_quant_of_product", "total_emp"),
+    "value_per_worker": Ratio("total_value_product", "total_emp"),
+    "percent_share_of_total_production": Share("total_quant_of_product"),
+    "percent_share_of_total_value": Share("total_value_product"),
+}
+
+
+def base_measures(names):
+    """
+    Collect the summed measures a set of derived metrics needs.
+
+    Args:
+        names (list): Names from `DERIVED_METRICS`.
+
+    Returns:
+        list: Measure names, in order of first use.
+    """
+    measures = []
+    for name in names:
+        measures.extend(measure for measure in DERIVED_METRICS[name].measures if measure not in measures)
+    return measures
+
+
+def derive(values, names):
+    """
+    Evaluate derived metrics over aggregated base measures.
+
+    Args:
+        values: Frame with one row per group, or dict of totals, holding
+            the `base_measures` of `names`.
+        names (list): Names from `DERIVED_METRICS`.
+
+    Returns:
+        pd.DataFrame or dict: `values` with one added column (or key) per metric.
+    """
+    derived = {name: DERIVED_METRICS[name].evaluate(values) for name in names}
+    if isinstance(values, dict):
+        return {**values, **derived}
+    return values.assign(**derived)
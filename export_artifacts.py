@@ -0,0 +1,564 @@
+"""
+Headless export of every dashboard chart and big-number artifact.
+
+Usage:
+    python export_artifacts.py [--csv PATH] [--incoming DIR] [--out-dir DIR] [--workers N] [--force]
+                               [--memory-limit-mb N] [--backend NAME] [--format {json,min,columnar,arrow}]
+                               [--gzip] [--delta]
+
+Artifacts are computed in one pass over the cached cube, without Streamlit.
+It is the dashboard's cube: the base CSV plus every ingested CSV drop.
+Files are written in parallel through atomic renames, and an artifact is
+only rewritten when its content fingerprint changed since the last run.
+
+The default format is the original pretty-printed JSON with one object per
+record. `min` writes the same records minified, `columnar` one minified
+array per column, and `arrow` Arrow IPC files; `--gzip` compresses any of
+them.
+
+With `--delta`, an artifact that was exported before is not rewritten.
+Instead, only its changed rows are written to `deltas/<sequence>/` under the
+output directory, as upserts and deletes by row key. Downstream copies then
+apply the deltas in sequence order to the last full export.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from backends import BACKENDS, DEFAULT_BACKEND, get_backend
+from cube import chart_data, metrics_data, production_by_province
+from data_loader import CSV_PATH, STORED_COLUMNS, map_arrow, source_fingerprint, write_arrow
+from ingest import INCOMING_DIR, IncrementalStore, drop_fingerprints
+
+OUTPUT_DIR = os.path.join("data", "metrics_data")
+
+# Version of the artifact computations; bump it whenever a change alters what
+# existing artifacts hold, so output of earlier code is recomputed
+ARTIFACT_VERSION = 1
+
+# Records the artifact source and per-artifact fingerprints of the last export
+MANIFEST_NAME = ".export_manifest.json"
+
+# Output formats and their file extensions
+FORMATS = {"json": ".json", "min": ".json", "columnar": ".json", "arrow": ".arrow"}
+DEFAULT_FORMAT = "json"
+
+# Delta mode: numbered delta directories, and the last exported rows of every artifact
+DELTA_DIR = "deltas"
+STATE_DIR = ".export_state"
+
+# Columns identifying a row of an artifact; a delta upserts or deletes rows by these
+KEY_COLUMNS = ["date", "month", "province", "type", "pieaces"]
+
+# Marks the rows of an Arrow delta as "upsert" or "delete"
+OP_COLUMN = "_op"
+
+SCENARIO = "FISHERY"
+CHART_MAPPING = {
+    "production_by_type": {"Chart": "Production by Type", "Type": "PIECHART", "Number": "1"},
+    "value_by_type": {"Chart": "Value by Type", "Type": "PIECHART", "Number": "2"},
+    "production_over_time": {"Chart": "Production Over Time", "Type": "LINECHART", "Number": "1"},
+    "value_over_time": {"Chart": "Value Over Time", "Type": "LINECHART", "Number": "2"},
+    "average_unit_value_over_time": {"Chart": "Average Unit Value Over Time of Catfishes", "Type": "LINECHART", "Number": "3"},
+    "top_production_provinces": {"Chart": "Top Provinces by Production", "Type": "BARCHART", "Number": "1"},
+    "top_value_provinces": {"Chart": "Top Provinces by Value", "Type": "BARCHART", "Number": "2"},
+    "monthly_pieaces": {"Chart": "Monthly Comparison of Top 3 Pieaces", "Type": "LINECHART", "Number": "4"},
+    "monthly_provinces": {"Chart": "Monthly Comparison of Top 3 Provinces", "Type": "LINECHART", "Number": "5"},
+    "export_import_over_time": {"Chart": "Export and Import Value Over Time", "Type": "LINECHART", "Number": "6"},
+    "net_trade_over_time": {"Chart": "Net Trade Value Over Time", "Type": "LINECHART", "Number": "7"},
+    "top_net_trade_provinces": {"Chart": "Top Provinces by Net Trade Value", "Type": "BARCHART", "Number": "3"},
+}
+
+METRICS_MAPPING = {
+    "total_production": {"Chart": "Total Production", "Type": "BIGNUMBER", "Number": "1"},
+    "total_value": {"Chart": "Total Value", "Type": "BIGNUMBER", "Number": "2"},
+    "average_unit_value": {"Chart": "Average Unit Value", "Type": "BIGNUMBER", "Number": "3"},
+    "total_employment": {"Chart": "Total Employment", "Type": "BIGNUMBER", "Number": "4"},
+}
+
+GEOMAP_MAPPING = {"Chart": "Total Production by Province", "Type": "GEOMAP", "Number": "1"}
+
+
+def artifact_name(chart_type, number_chart):
+    """
+    Return the name of an artifact without extension, e.g. `FISHERY_PIECHART_1`.
+    """
+    return f"{SCENARIO}_{chart_type}_{number_chart}"
+
+
+def artifact_filename(chart_type, number_chart, extension=".json"):
+    """
+    Return the file name of an artifact, e.g. `FISHERY_PIECHART_1.json`.
+    """
+    return artifact_name(chart_type, number_chart) + extension
+
+
+def iso_dates(data):
+    """
+    Convert the datetime columns of a frame to ISO 8601 strings, column at a time.
+
+    Returns:
+        pd.DataFrame: `data` itself when it has no datetime column, otherwise a copy.
+    """
+    converted = {}
+    for column in data.columns:
+        if pd.api.types.is_datetime64_dtype(data[column]):
+            values = data[column].to_numpy().astype("datetime64[us]")
+            # Like `Timestamp.isoformat`, only show microseconds when there are any
+            whole_seconds = not np.any(values.view("int64") % 1_000_000)
+            converted[column] = np.datetime_as_string(values, unit="s" if whole_seconds else "us")
+    return data.assign(**converted) if converted else data
+
+
+def chart_columns(data):
+    """
+    Return the columns of a chart as JSON arrays keyed by column name, with ISO 8601 dates.
+    """
+    data = iso_dates(data)
+    return {column: data[column].tolist() for column in data.columns}
+
+
+def chart_records(data):
+    """
+    Return the rows of a chart as JSON records, with ISO 8601 dates.
+    """
+    # Zipping whole-column lists is several times faster than `to_dict(orient="records")`
+    columns = chart_columns(data)
+    return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+
+def chart_payload(data, chart_name):
+    """
+    Build the JSON document for a chart.
+
+    Args:
+        data (pd.DataFrame): The chart data.
+        chart_name (str): Name of the chart.
+
+    Returns:
+        dict: `{"value": [records...], "chart_name": ...}` with ISO 8601 dates.
+    """
+    return {
+        "value": chart_records(data),
+        "chart_name": chart_name
+    }
+
+
+def metrics_payload(data, chart_name):
+    """
+    Build the JSON document for a big-number metric.
+    """
+    return {
+        "value": data,
+        "chart_name": chart_name
+    }
+
+
+def geomap_data(cube):
+    """
+    Total production per province, formatted as in the Datawrapper map.
+    """
+    geomaps_df = production_by_province(cube)
+    geomaps_df['total_quant_of_product'] = geomaps_df['total_quant_of_product'].astype(float)
+    geomaps_df['total_quant_of_product'] = geomaps_df['total_quant_of_product'].apply(lambda x: "{:,.2f}".format(x))
+    return geomaps_df
+
+
+def collect_artifacts(cube, backend=None):
+    """
+    Compute the data of every chart, big-number and geomap artifact from a cube.
+
+    Args:
+        cube (pd.DataFrame): The aggregated cube, see `cube.build_cube`.
+        backend (QueryBackend): Engine for the aggregations; pandas if None.
+
+    Returns:
+        dict: `(chart name, data frame or metric value)` keyed by artifact name.
+    """
+    artifacts = {}
+    charts = chart_data(cube, backend=backend)
+    for name, mapping in CHART_MAPPING.items():
+        artifacts[artifact_name(mapping["Type"], mapping["Number"])] = (mapping["Chart"], charts[name])
+
+    metrics = metrics_data(cube, backend=backend)
+    for name, mapping in METRICS_MAPPING.items():
+        artifacts[artifact_name(mapping["Type"], mapping["Number"])] = (mapping["Chart"], metrics[name])
+
+    artifacts[artifact_name(GEOMAP_MAPPING["Type"], GEOMAP_MAPPING["Number"])] = (
+        GEOMAP_MAPPING["Chart"], geomap_data(cube)
+    )
+    return artifacts
+
+
+def build_artifacts(cube, backend=None):
+    """
+    Compute every chart, big-number and geomap artifact from a cube.
+
+    Args:
+        cube (pd.DataFrame): The aggregated cube, see `cube.build_cube`.
+        backend (QueryBackend): Engine for the aggregations; pandas if None.
+
+    Returns:
+        dict: JSON documents keyed by file name.
+    """
+    return {
+        name + ".json": chart_payload(data, chart_name) if isinstance(data, pd.DataFrame) else metrics_payload(data, chart_name)
+        for name, (chart_name, data) in collect_artifacts(cube, backend).items()
+    }
+
+
+def _json_bytes(payload, fmt):
+    if fmt == "json":
+        return json.dumps(payload, indent=4).encode()
+    # Without indentation the C encoder is used, which is several times faster
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+
+def _arrow_bytes(table, chart_name):
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"chart_name": chart_name.encode()})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _as_frame(data):
+    """
+    A chart as is, a metric value as a one-row frame with a `value` column.
+    """
+    return data if isinstance(data, pd.DataFrame) else pd.DataFrame({"value": [data]})
+
+
+def encode_artifact(chart_name, data, fmt=DEFAULT_FORMAT):
+    """
+    Serialize one artifact.
+
+    Args:
+        chart_name (str): Name of the chart.
+        data (pd.DataFrame or float): Chart data or metric value.
+        fmt (str): One of `FORMATS`.
+
+    Returns:
+        bytes: The file content.
+    """
+    if fmt == "arrow":
+        return _arrow_bytes(pa.Table.from_pandas(_as_frame(data), preserve_index=False), chart_name)
+    if not isinstance(data, pd.DataFrame):
+        return _json_bytes(metrics_payload(data, chart_name), fmt)
+    rows = chart_columns(data) if fmt == "columnar" else chart_records(data)
+    return _json_bytes({"value": rows, "chart_name": chart_name}, fmt)
+
+
+def _key_hashes(frame):
+    keys = [column for column in KEY_COLUMNS if column in frame.columns]
+    if keys:
+        return pd.util.hash_pandas_object(frame[keys], index=False).to_numpy()
+    # Without key columns, such as a metric, rows are identified by position
+    return pd.util.hash_array(np.arange(len(frame)))
+
+
+def diff_rows(previous, current):
+    """
+    Find the rows of an artifact that changed between two exports.
+
+    Rows are compared by hash, a whole frame at a time.
+
+    Args:
+        previous (pd.DataFrame): Rows of the last export.
+        current (pd.DataFrame): Rows of this export.
+
+    Returns:
+        tuple: The new or changed rows of `current`, and the key columns of
+        the rows of `previous` whose key no longer exists.
+    """
+    if list(previous.columns) != list(current.columns):
+        raise ValueError("Columns changed since the last export")
+    changed = ~np.isin(
+        pd.util.hash_pandas_object(current, index=False).to_numpy(),
+        pd.util.hash_pandas_object(previous, index=False).to_numpy(),
+    )
+    removed = ~np.isin(_key_hashes(previous), _key_hashes(current))
+    keys = [column for column in KEY_COLUMNS if column in previous.columns]
+    deletes = previous.loc[removed, keys] if keys else pd.DataFrame({"row": np.flatnonzero(removed)})
+    return current[changed], deletes.reset_index(drop=True)
+
+
+def encode_delta(chart_name, upserts, deletes, fmt=DEFAULT_FORMAT):
+    """
+    Serialize the changes of one artifact.
+
+    JSON formats hold `{"upserts": rows, "deletes": keys, "chart_name": ...}`;
+    an Arrow delta is one table whose `_op` column tells upserts from deletes.
+
+    Returns:
+        bytes: The file content.
+    """
+    if fmt == "arrow":
+        parts = [upserts.assign(**{OP_COLUMN: "upsert"})]
+        if len(deletes):
+            parts.append(deletes.assign(**{OP_COLUMN: "delete"}))
+        rows = pd.concat(parts, ignore_index=True)
+        return _arrow_bytes(pa.Table.from_pandas(rows, preserve_index=False), chart_name)
+    rows = chart_columns if fmt == "columnar" else chart_records
+    return _json_bytes({"upserts": rows(upserts), "deletes": rows(deletes), "chart_name": chart_name}, fmt)
+
+
+def write_bytes_atomic(content, path):
+    """
+    Write a file so readers never observe it partially written.
+
+    Args:
+        content (bytes): The file content.
+        path (str): Destination path.
+    """
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.splitext(path)[1])
+    try:
+        with os.fdopen(fd, "wb") as output_file:
+            output_file.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def write_json_atomic(payload, path, indent=4):
+    """
+    Write a JSON document so readers never observe a partially written file.
+
+    Args:
+        payload: JSON-serializable document.
+        path (str): Destination path.
+        indent (int): Indentation passed to `json.dumps`.
+    """
+    write_bytes_atomic(json.dumps(payload, indent=indent).encode(), path)
+
+
+# Function to export chart data to JSON
+def export_chart_to_json(data, chart_name, chart_type, number_chart, out_dir=OUTPUT_DIR):
+    """
+    Export chart data to a JSON file in the specified format.
+
+    Args:
+        data (pd.DataFrame): The chart data.
+        chart_name (str): Name of the chart.
+        chart_type (str): Chart type, e.g. "PIECHART".
+        number_chart (str): Number of the chart within its type.
+        out_dir (str): Directory to write the JSON file to.
+    """
+    path = os.path.join(out_dir, artifact_filename(chart_type, number_chart))
+    write_json_atomic(chart_payload(data, chart_name), path)
+    print(f"Chart data exported to {path}")
+
+
+def export_metrics_to_json(data, chart_name, number_chart, out_dir=OUTPUT_DIR):
+    """
+    Export a big-number metric to a JSON file in the specified format.
+
+    Args:
+        data (float): The metric value.
+        chart_name (str): Name of the metric.
+        number_chart (str): Number of the metric.
+        out_dir (str): Directory to write the JSON file to.
+    """
+    path = os.path.join(out_dir, artifact_filename("BIGNUMBER", number_chart))
+    write_json_atomic(metrics_payload(data, chart_name), path)
+    print(f"Chart data exported to {path}")
+
+
+def artifact_source(csv_path=CSV_PATH, incoming_dir=INCOMING_DIR):
+    """
+    Fingerprint everything the artifacts are computed from.
+
+    Besides the source CSV and its CSV drops, this covers the stored column
+    layout and `ARTIFACT_VERSION`, so output of an earlier layout or earlier
+    computations is never taken as up to date.
+
+    Args:
+        csv_path (str): Path to the source CSV file.
+        incoming_dir (str): Directory of CSV drops, see `ingest.py`.
+
+    Returns:
+        str: A string that changes whenever existing artifacts may change.
+    """
+    state = [source_fingerprint(csv_path), ",".join(STORED_COLUMNS), f"artifacts-v{ARTIFACT_VERSION}"]
+    state += [f"{path}={fingerprint}" for path, fingerprint in sorted(drop_fingerprints(incoming_dir).items())]
+    return hashlib.sha1("\n".join(state).encode()).hexdigest()[:16]
+
+
+def _read_manifest(path):
+    try:
+        with open(path) as manifest_file:
+            return json.load(manifest_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def export_all(
+    csv_path=CSV_PATH, out_dir=OUTPUT_DIR, workers=8, force=False, memory_limit_mb=None, backend=None,
+    fmt=DEFAULT_FORMAT, compress=False, delta=False, incoming_dir=INCOMING_DIR,
+):
+    """
+    Export all artifacts, skipping work whose inputs have not changed.
+
+    When the source CSV, its drops, the column layout and `ARTIFACT_VERSION`
+    are unchanged since the last export and every file is still present,
+    nothing is loaded or written. Otherwise all artifacts are
+    computed from one cube and only those whose content changed are written.
+
+    Args:
+        csv_path (str): Path to the source CSV file.
+        out_dir (str): Directory to write the artifacts to.
+        workers (int): Number of parallel writer threads.
+        force (bool): Rewrite every artifact regardless of fingerprints.
+        memory_limit_mb (float): Aggregate the CSV in chunks within this ceiling
+            instead of loading it whole, when its cube has not been published yet.
+        backend (QueryBackend): Engine for the aggregations; pandas if None.
+        fmt (str): Output format, one of `FORMATS`.
+        compress (bool): Gzip every file.
+        delta (bool): Write the changed rows of previously exported artifacts
+            to a new delta directory instead of rewriting them.
+        incoming_dir (str): Directory of CSV drops merged into the cube.
+
+    Returns:
+        list: Paths written, relative to `out_dir`.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    manifest = {} if force else _read_manifest(manifest_path)
+    output_format = fmt + ("+gzip" if compress else "")
+    # Manifests written before formats existed describe the default format
+    previous = manifest.get("artifacts", {}) if manifest.get("format", DEFAULT_FORMAT) == output_format else {}
+
+    # Full files whose changes were only written as deltas so far
+    stale = set(manifest.get("stale", [])) if previous else set()
+
+    fingerprint = artifact_source(csv_path, incoming_dir)
+    if (
+        manifest.get("source") == fingerprint
+        and previous
+        and all(os.path.exists(os.path.join(out_dir, name)) for name in previous)
+        and (delta or not stale)
+    ):
+        return []
+
+    cube = IncrementalStore(csv_path, incoming_dir, memory_limit_mb=memory_limit_mb).cube
+    artifacts = collect_artifacts(cube, backend)
+
+    extension = FORMATS[fmt] + (".gz" if compress else "")
+    sequence = manifest.get("sequence", 0) + 1
+    delta_dir = os.path.join(DELTA_DIR, f"{sequence:06d}")
+    state_dir = os.path.join(out_dir, STATE_DIR)
+    if delta:
+        os.makedirs(state_dir, exist_ok=True)
+
+    def write(content, name):
+        path = os.path.join(out_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # A zero mtime keeps the gzip output identical for identical content
+        write_bytes_atomic(gzip.compress(content, mtime=0) if compress else content, path)
+
+    def export(name):
+        """
+        Write one artifact, or its delta; return the path written (or None) and its fingerprint.
+        """
+        chart_name, data = artifacts[name]
+        filename = name + extension
+        state_path = os.path.join(state_dir, name + ".arrow")
+        exported = previous.get(filename) and os.path.exists(os.path.join(out_dir, filename))
+
+        if delta and exported and os.path.exists(state_path):
+            try:
+                upserts, deletes = diff_rows(map_arrow(state_path), _as_frame(data))
+            except ValueError:
+                upserts = deletes = None
+            if upserts is not None:
+                if not len(upserts) and not len(deletes):
+                    return None, previous[filename]
+                write(encode_delta(chart_name, upserts, deletes, fmt), os.path.join(delta_dir, filename))
+                write_arrow(_as_frame(data), state_path)
+                # The full file still holds the previous content
+                return os.path.join(delta_dir, filename), previous[filename]
+
+        content = encode_artifact(chart_name, data, fmt)
+        digest = hashlib.sha256(content).hexdigest()
+        if exported and previous[filename] == digest:
+            written = None
+        else:
+            write(content, filename)
+            written = filename
+        # Keep the rows deltas are computed against once delta mode was used
+        if delta or (written and os.path.exists(state_path)):
+            write_arrow(_as_frame(data), state_path)
+        return written, digest
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = dict(zip(artifacts, executor.map(export, artifacts)))
+
+    written = [path for path, _ in results.values() if path]
+    deltas = {os.path.basename(path) for path in written if path.startswith(DELTA_DIR + os.sep)}
+    if delta:
+        stale = (stale - set(written)) | deltas
+    else:
+        stale = set()
+    write_json_atomic(
+        {
+            "source": fingerprint,
+            "format": output_format,
+            "artifacts": {name + extension: digest for name, (_, digest) in results.items()},
+            "sequence": sequence if deltas else sequence - 1,
+            "stale": sorted(stale),
+        },
+        manifest_path,
+    )
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export all fishery dashboard artifacts.")
+    parser.add_argument("--csv", default=CSV_PATH, help="source CSV file")
+    parser.add_argument("--incoming", default=INCOMING_DIR, help="directory of CSV drops")
+    parser.add_argument("--out-dir", default=OUTPUT_DIR, help="directory to write the artifacts to")
+    parser.add_argument("--workers", type=int, default=8, help="parallel writer threads")
+    parser.add_argument("--force", action="store_true", help="rewrite every artifact")
+    parser.add_argument(
+        "--memory-limit-mb", type=float, default=None,
+        help="stream the CSV in chunks within this memory ceiling",
+    )
+    parser.add_argument(
+        "--backend", choices=list(BACKENDS), default=DEFAULT_BACKEND, help="query backend for the aggregations"
+    )
+    parser.add_argument("--format", choices=list(FORMATS), default=DEFAULT_FORMAT, help="output format")
+    parser.add_argument("--gzip", action="store_true", help="gzip every file")
+    parser.add_argument(
+        "--delta", action="store_true",
+        help="write only the changed rows of previously exported artifacts, to a new delta directory",
+    )
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    written = export_all(
+        args.csv, args.out_dir, workers=args.workers, force=args.force, memory_limit_mb=args.memory_limit_mb,
+        backend=get_backend(args.backend), fmt=args.format, compress=args.gzip, delta=args.delta,
+        incoming_dir=args.incoming,
+    )
+    elapsed = time.perf_counter() - start
+    if written:
+        for name in written:
+            print(f"Chart data exported to {os.path.join(args.out_dir, name)}")
+    else:
+        print("All artifacts are up to date.")
+    print(f"Done in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
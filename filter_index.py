@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+FILTER_COLUMNS = ["province", "type", "pieaces"]
+
+
+class FilterIndex:
+    """
+    Row-position indexes for the dashboard filters.
+
+    The frame is stored sorted by date so a date range is a contiguous slice
+    found with `searchsorted`, and every value of a filter column maps to the
+    sorted array of row positions holding it. A filter selection is then the
+    intersection of at most three position arrays clipped to the date slice,
+    without scanning or copying whole columns. A frame that is already
+    date-sorted, such as a memory-mapped one, is used as is.
+
+    Args:
+        frame (pd.DataFrame): Raw rows or cube cells with the filter columns and `date`.
+        columns (list): Columns to index.
+    """
+
+    def __init__(self, frame, columns=FILTER_COLUMNS):
+        self.columns = list(columns)
+
+        if not frame['date'].is_monotonic_increasing:
+            order = np.argsort(frame['date'].to_numpy(), kind="stable")
+            frame = frame.iloc[order].reset_index(drop=True)
+        self.frame = frame
+        self.dates = frame['date'].to_numpy()
+
+        self._codes = {}
+        self._positions = {}
+        for column in self.columns:
+            values = frame[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                # Option lists follow the category order
+                codes = values.cat.codes.to_numpy()
+                uniques = np.asarray(values.cat.categories.astype(str))
+            else:
+                codes, uniques = pd.factorize(values.astype(str))
+                uniques = np.asarray(uniques)
+            self._codes[column] = (codes, uniques)
+
+            by_code = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[by_code], np.arange(len(uniques) + 1))
+            self._positions[column] = {
+                value: by_code[bounds[code]:bounds[code + 1]]
+                for code, value in enumerate(uniques)
+                if bounds[code + 1] > bounds[code]
+            }
+
+    def __len__(self):
+        return len(self.frame)
+
+    def date_slice(self, start_date=None, end_date=None):
+        """
+        Return the [start, stop) positions of an inclusive date range.
+        """
+        start = 0 if start_date is None else np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start_date)), "left")
+        stop = len(self.dates) if end_date is None else np.searchsorted(self.dates, np.datetime64(pd.Timestamp(end_date)), "right")
+        return int(start), int(stop)
+
+    def select(self, province="All", type_filter="All", pieace="All", start_date=None, end_date=None):
+        """
+        Return the sorted row positions matching a filter selection.
+
+        Args:
+            province (str): Province to keep, or "All".
+            type_filter (str): Fishery type to keep, or "All".
+            pieace (str): Pieace to keep, or "All".
+            start_date: Inclusive lower date bound, or None.
+            end_date: Inclusive upper date bound, or None.
+
+        Returns:
+            np.ndarray: Positions into `self.frame`.
+        """
+        start, stop = self.date_slice(start_date, end_date)
+        selections = [
+            self._positions[column].get(str(value), np.empty(0, dtype=np.intp))
+            for column, value in zip(self.columns, (province, type_filter, pieace))
+            if value != "All"
+        ]
+        if not selections:
+            return np.arange(start, stop)
+
+        selections.sort(key=len)
+        smallest = selections[0]
+        positions = smallest[np.searchsorted(smallest, start):np.searchsorted(smallest, stop)]
+        for other in selections[1:]:
+            positions = np.intersect1d(positions, other, assume_unique=True)
+        return positions
+
+    def take(self, positions):
+        """
+        Return the rows at the given positions.
+        """
+        return self.frame.iloc[positions]
+
+    def options(self, column, positions=None):
+        """
+        List the values of `column` present at `positions`.
+
+        Args:
+            column (str): One of the indexed columns.
+            positions (np.ndarray): Row positions, or None for all rows.
+
+        Returns:
+            list: The distinct values, in category (or first appearance) order.
+        """
+        codes, uniques = self._codes[column]
+        present = np.unique(codes if positions is None else codes[positions])
+        return list(uniques[present[present >= 0]])
@@ -0,0 +1,263 @@
+"""
+Province geometry for the dashboard's map.
+
+The source GeoJSON is simplified once (Douglas-Peucker), its coordinates
+rounded and its rings wound the way Vega-Lite expects. The result is
+cached in a `.simplified.json` sidecar next to the source and only
+rebuilt when the source or the settings change, so every chart embeds a
+small geometry.
+
+Without a boundary file the map places one symbol per province at its
+provincial seat, from the small table shipped in `SEATS_PATH`.
+"""
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from data_loader import source_fingerprint
+
+# Any GeoJSON FeatureCollection of Thai province polygons
+GEOJSON_PATH = os.environ.get("PROVINCE_GEOJSON", os.path.join("data", "geo", "thailand_provinces.geojson"))
+
+# Latitude and longitude of the seat of every province, rounded to 0.01 degrees
+SEATS_PATH = os.path.join("data", "geo", "province_seats.csv")
+
+# Largest deviation of a simplified outline from the original, in degrees (~1 km)
+SIMPLIFY_TOLERANCE = 0.01
+
+# Decimals kept per coordinate; 3 is about 100 m
+COORDINATE_DECIMALS = 3
+
+# Feature properties tried, in order, for the province name
+NAME_PROPERTIES = ["name", "NAME_1", "ADM1_EN", "pro_en", "province"]
+
+# Spellings that differ between the data and common boundary files, by normalized name
+PROVINCE_ALIASES = {
+    "bangkokmetropolis": "bangkok",
+    "krungthepmahanakhon": "bangkok",
+    "samutprakarn": "samutprakan",
+    "phetburi": "phetchaburi",
+    "chumpon": "chumphon",
+    "phattalung": "phatthalung",
+}
+
+
+def province_key(name):
+    """
+    Normalize a province name so the data and the boundaries match.
+
+    Case, spaces and punctuation are ignored ("Chon Buri" and "Chonburi"
+    match), and known alternative spellings are mapped to one name.
+
+    Args:
+        name (str): Province name as spelled in either source.
+
+    Returns:
+        str: The matching key.
+    """
+    key = re.sub(r"[^a-z]", "", str(name).lower())
+    return PROVINCE_ALIASES.get(key, key)
+
+
+def simplified_path(geojson_path=GEOJSON_PATH):
+    """
+    Return the path of the simplified sidecar of a GeoJSON file.
+    """
+    return os.path.splitext(geojson_path)[0] + ".simplified.json"
+
+
+def geometry_fingerprint(geojson_path=GEOJSON_PATH):
+    """
+    Fingerprint the source GeoJSON, or None while it does not exist.
+    """
+    if not os.path.exists(geojson_path):
+        return None
+    return source_fingerprint(geojson_path)
+
+
+def _simplify_ring(points, tolerance):
+    """
+    Douglas-Peucker simplification of a closed ring.
+
+    Args:
+        points (np.ndarray): (n, 2) coordinates, first equal to last.
+        tolerance (float): Largest allowed deviation.
+
+    Returns:
+        np.ndarray: The kept points, still closed.
+    """
+    keep = np.zeros(len(points), dtype=bool)
+    keep[[0, -1]] = True
+    spans = [(0, len(points) - 1)]
+    while spans:
+        start, end = spans.pop()
+        if end - start < 2:
+            continue
+        inner = points[start + 1:end]
+        origin = points[start]
+        direction = points[end] - origin
+        length = np.hypot(*direction)
+        if length == 0:
+            # The ring's closing span: measure the distance to its first point
+            distances = np.hypot(*(inner - origin).T)
+        else:
+            distances = np.abs(direction[0] * (inner[:, 1] - origin[1]) - direction[1] * (inner[:, 0] - origin[0])) / length
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = start + 1 + farthest
+            keep[split] = True
+            spans.extend([(start, split), (split, end)])
+    return points[keep]
+
+
+def _signed_area(ring):
+    x, y = ring[:, 0], ring[:, 1]
+    return 0.5 * float(np.sum(x[:-1] * y[1:] - x[1:] * y[:-1]))
+
+
+def _clean_ring(ring, tolerance, decimals, exterior):
+    """
+    Simplify, round and wind one ring; None if it collapses.
+
+    Vega-Lite draws with d3-geo, which needs clockwise exterior rings and
+    counter-clockwise holes, the opposite of RFC 7946.
+    """
+    points = np.asarray(ring, dtype="float64")[:, :2]
+    if len(points) < 4:
+        return None
+    if not np.array_equal(points[0], points[-1]):
+        points = np.vstack([points, points[:1]])
+    simplified = np.round(_simplify_ring(points, tolerance), decimals)
+    simplified = simplified[np.r_[True, np.any(np.diff(simplified, axis=0) != 0, axis=1)]]
+    if len(simplified) < 4:
+        if not exterior:
+            return None
+        # Keep small islands rather than dropping them from the map
+        simplified = np.round(points, decimals)
+    if (_signed_area(simplified) < 0) != exterior:
+        simplified = simplified[::-1]
+    return simplified.tolist()
+
+
+def _clean_polygon(rings, tolerance, decimals):
+    exterior = _clean_ring(rings[0], tolerance, decimals, exterior=True)
+    if exterior is None:
+        return None
+    holes = (_clean_ring(ring, tolerance, decimals, exterior=False) for ring in rings[1:])
+    return [exterior] + [hole for hole in holes if hole is not None]
+
+
+def simplify_geometry(geometry, tolerance=SIMPLIFY_TOLERANCE, decimals=COORDINATE_DECIMALS):
+    """
+    Simplify a GeoJSON Polygon or MultiPolygon for drawing.
+
+    Args:
+        geometry (dict): GeoJSON geometry; other types are returned as is.
+        tolerance (float): Largest deviation of the simplified outline, in degrees.
+        decimals (int): Decimals kept per coordinate.
+
+    Returns:
+        dict or None: The simplified geometry, or None if nothing is left of it.
+    """
+    if geometry is None:
+        return None
+    if geometry["type"] == "Polygon":
+        polygons = [geometry["coordinates"]]
+    elif geometry["type"] == "MultiPolygon":
+        polygons = geometry["coordinates"]
+    else:
+        return geometry
+    polygons = [polygon for polygon in (_clean_polygon(rings, tolerance, decimals) for rings in polygons) if polygon]
+    if not polygons:
+        return None
+    if len(polygons) == 1:
+        return {"type": "Polygon", "coordinates": polygons[0]}
+    return {"type": "MultiPolygon", "coordinates": polygons}
+
+
+def _feature_name(properties):
+    for name in NAME_PROPERTIES:
+        if properties.get(name):
+            return str(properties[name])
+    return None
+
+
+def simplify_provinces(collection, tolerance=SIMPLIFY_TOLERANCE, decimals=COORDINATE_DECIMALS):
+    """
+    Reduce a FeatureCollection to simplified province outlines.
+
+    Args:
+        collection (dict): Parsed GeoJSON FeatureCollection.
+        tolerance (float): Largest deviation of the simplified outlines, in degrees.
+        decimals (int): Decimals kept per coordinate.
+
+    Returns:
+        list: Features whose properties only hold the province `name` and its `key`.
+    """
+    features = []
+    for feature in collection["features"]:
+        name = _feature_name(feature.get("properties") or {})
+        geometry = simplify_geometry(feature.get("geometry"), tolerance, decimals)
+        if name is None or geometry is None:
+            continue
+        features.append({
+            "type": "Feature",
+            "properties": {"name": name, "key": province_key(name)},
+            "geometry": geometry,
+        })
+    return features
+
+
+def load_provinces(geojson_path=GEOJSON_PATH, tolerance=SIMPLIFY_TOLERANCE, decimals=COORDINATE_DECIMALS):
+    """
+    Load the simplified province outlines, preferring the sidecar.
+
+    Args:
+        geojson_path (str): Source GeoJSON FeatureCollection.
+        tolerance (float): Largest deviation of the simplified outlines, in degrees.
+        decimals (int): Decimals kept per coordinate.
+
+    Returns:
+        list or None: Features as returned by `simplify_provinces`, or None
+        when the source file does not exist.
+    """
+    fingerprint = geometry_fingerprint(geojson_path)
+    if fingerprint is None:
+        return None
+    settings = {"source": fingerprint, "tolerance": tolerance, "decimals": decimals}
+    path = simplified_path(geojson_path)
+
+    if os.path.exists(path):
+        try:
+            with open(path) as sidecar:
+                cached = json.load(sidecar)
+            if cached.get("settings") == settings:
+                return cached["features"]
+        except (OSError, ValueError):
+            pass
+
+    with open(geojson_path) as source:
+        features = simplify_provinces(json.load(source), tolerance, decimals)
+    try:
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as sidecar:
+            json.dump({"settings": settings, "features": features}, sidecar, separators=(",", ":"))
+        os.replace(tmp_path, path)
+    except OSError as e:
+        # A read-only checkout still works, it just simplifies again next time
+        print(f"Could not write simplified geometry {path}: {e}")
+    return features
+
+
+def load_province_seats(path=SEATS_PATH):
+    """
+    Load the location of every province's seat.
+
+    Returns:
+        pd.DataFrame: `province`, `latitude`, `longitude` and the matching `key`.
+    """
+    seats = pd.read_csv(path)
+    return seats.assign(key=seats['province'].map(province_key))
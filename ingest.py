@@ -0,0 +1,341 @@
+"""
+Incremental ingestion of daily CSV drops.
+
+Usage:
+    python ingest.py [--csv PATH] [--incoming DIR]
+
+New CSV files placed in the incoming directory are validated, converted to
+THB and merged into the cached cube cell by cell, without re-reading or
+re-aggregating the rows that were already loaded. Rows seen before (in the
+base CSV or an earlier drop) are skipped, so re-delivered or appended-to
+files are safe to ingest again.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from cube import CUBE_MEASURES, build_cube, merge_cubes
+from data_loader import (
+    CATEGORY_COLUMNS,
+    CSV_PATH,
+    STORED_COLUMNS,
+    load_data,
+    map_arrow,
+    prepare_frame,
+    source_fingerprint,
+    write_arrow,
+)
+from filter_index import FilterIndex
+from streaming import stream_cube
+
+INCOMING_DIR = os.path.join("data", "incoming")
+
+# Minimum seconds between two scans of the incoming directory
+REFRESH_INTERVAL = 2
+
+# Measures that can never be negative in a valid record
+NON_NEGATIVE_COLUMNS = ["total_quant_of_product", "total_value_product", "total_emp", "export_value", "import_value"]
+
+
+def validate_rows(raw):
+    """
+    Validate the rows of a CSV drop.
+
+    Args:
+        raw (pd.DataFrame): Rows as read from the drop, all columns unparsed.
+
+    Returns:
+        tuple: (valid rows with parsed types, number of rejected rows).
+
+    Raises:
+        ValueError: If the drop lacks any of the stored source columns; the
+            derived ratio and share columns are optional and ignored.
+    """
+    missing = [column for column in STORED_COLUMNS if column not in raw.columns]
+    if missing:
+        raise ValueError(f"missing columns: {', '.join(missing)}")
+
+    df = raw[STORED_COLUMNS].copy()
+    df['date'] = pd.to_datetime(df['date'], format="ISO8601", errors="coerce")
+    numeric = [column for column in STORED_COLUMNS if column != 'date' and column not in CATEGORY_COLUMNS]
+    df[numeric] = df[numeric].apply(pd.to_numeric, errors="coerce")
+
+    valid = df[['date'] + CATEGORY_COLUMNS + CUBE_MEASURES].notna().all(axis=1)
+    valid &= (df[NON_NEGATIVE_COLUMNS] >= 0).all(axis=1)
+    return df[valid].reset_index(drop=True), int((~valid).sum())
+
+
+def drop_fingerprints(incoming_dir=INCOMING_DIR):
+    """
+    Fingerprint the CSV drops currently in the incoming directory.
+
+    Returns:
+        dict: Fingerprint per drop path.
+    """
+    if not os.path.isdir(incoming_dir):
+        return {}
+    return {
+        os.path.join(incoming_dir, name): source_fingerprint(os.path.join(incoming_dir, name))
+        for name in sorted(os.listdir(incoming_dir))
+        if name.endswith(".csv")
+    }
+
+
+def row_hashes(df):
+    """
+    Hash each row's stored columns, to recognise rows that were already ingested.
+    """
+    return pd.util.hash_pandas_object(df[STORED_COLUMNS], index=False).to_numpy()
+
+
+class IncrementalStore:
+    """
+    The cube of the base CSV plus every ingested drop, shared read-only.
+
+    The date-sorted cube is published as an Arrow IPC file next to the CSV,
+    together with the row hashes used for de-duplication, and both are
+    memory-mapped. File names derive from the base CSV and drop
+    fingerprints, so every server process that sees the same inputs maps
+    the same files: the first one builds them, the others only map them, and
+    the OS page cache holds a single copy for all processes and sessions.
+    A `.state.json` pointer records the latest state and the drops it holds,
+    so a process starting later only ingests the drops that arrived since.
+
+    Args:
+        csv_path (str): Path to the base CSV file.
+        incoming_dir (str): Directory scanned for new CSV drops.
+        refresh_interval (float): Minimum seconds between two directory scans.
+        memory_limit_mb (float): When the base cube has to be built, aggregate
+            the CSV in chunks within this ceiling instead of loading it whole.
+    """
+
+    def __init__(self, csv_path=CSV_PATH, incoming_dir=INCOMING_DIR, refresh_interval=REFRESH_INTERVAL,
+                 memory_limit_mb=None):
+        self.csv_path = csv_path
+        self.incoming_dir = incoming_dir
+        self.refresh_interval = refresh_interval
+        self.source = source_fingerprint(csv_path)
+
+        # Incremented whenever the cube changes, e.g. to key caches of derived data
+        self.revision = 0
+        self._files = {}
+        self._published = None
+        self._last_scan = 0.0
+        self._lock = threading.Lock()
+
+        # Map the latest published state and only ingest the drops it lacks;
+        # a process that finds none builds the cube from the CSV
+        latest = self._read_pointer()
+        if latest is not None and self._map(latest["key"]):
+            self._files = latest["files"]
+        elif memory_limit_mb:
+            hashes = []
+            cube = stream_cube(csv_path, memory_limit_mb, on_chunk=lambda chunk: hashes.append(row_hashes(chunk)))
+            self._publish(cube, np.unique(np.concatenate(hashes)) if hashes else np.empty(0, dtype="uint64"))
+        else:
+            base = load_data(csv_path)
+            self._publish(build_cube(base), np.unique(row_hashes(base)))
+        self.refresh(force=True)
+
+    @property
+    def cube(self):
+        """
+        The current cube, sorted by date and read-only.
+        """
+        return self.index.frame
+
+    def _state_key(self, files):
+        # The column layout is part of the key, so files of an older layout are never mapped
+        state = [self.source, ",".join(STORED_COLUMNS)]
+        state += [f"{path}={fingerprint}" for path, fingerprint in sorted(files.items())]
+        return hashlib.sha1("\n".join(state).encode()).hexdigest()[:16]
+
+    def _paths(self, key):
+        base = os.path.splitext(self.csv_path)[0]
+        return f"{base}.{key}.cube.arrow", f"{base}.{key}.hashes.npy"
+
+    def _pointer_path(self):
+        return os.path.splitext(self.csv_path)[0] + ".state.json"
+
+    def _read_pointer(self):
+        """
+        Read the latest published state: its key and the drops it holds.
+
+        Returns:
+            dict or None: `{"key": ..., "files": ...}`, or None if there is
+            none for the current base CSV and column layout.
+        """
+        try:
+            with open(self._pointer_path()) as pointer_file:
+                latest = json.load(pointer_file)
+            if latest["key"] == self._state_key(latest["files"]):
+                return latest
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return None
+
+    def _remove_superseded(self, key):
+        """
+        Remove every published state of this CSV other than `key`.
+        """
+        directory = os.path.dirname(self.csv_path) or "."
+        base = os.path.basename(os.path.splitext(self.csv_path)[0])
+        pattern = re.compile(re.escape(base) + r"\.([0-9a-f]{16})\.(cube\.arrow|hashes\.npy)$")
+        for name in os.listdir(directory):
+            match = pattern.match(name)
+            if match and match.group(1) != key:
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
+
+    def _map(self, key):
+        """
+        Map the published state `key`, if some process already wrote it.
+        """
+        cube_path, hashes_path = self._paths(key)
+        if not (os.path.exists(cube_path) and os.path.exists(hashes_path)):
+            return False
+        try:
+            index = FilterIndex(map_arrow(cube_path))
+            hashes = np.load(hashes_path, mmap_mode="r")
+        except (OSError, ValueError, pa.ArrowInvalid):
+            return False
+        self.index, self._hashes = index, hashes
+        self.revision += 1
+        self._published = key
+        return True
+
+    def _publish(self, cube, hashes):
+        """
+        Write the current state for all processes and map it back read-only.
+
+        The state is then recorded as the latest one, for processes starting
+        later, and every state it supersedes is removed.
+        """
+        key = self._state_key(self._files)
+        cube_path, hashes_path = self._paths(key)
+        try:
+            # Hashes first: readers only map a state once its cube file exists
+            tmp_path = f"{hashes_path}.{os.getpid()}.tmp.npy"
+            np.save(tmp_path, hashes)
+            os.replace(tmp_path, hashes_path)
+            write_arrow(cube.sort_values('date', kind="stable", ignore_index=True), cube_path)
+        except OSError as e:
+            # A read-only checkout still works, each process just keeps its own copy
+            print(f"Could not publish shared cube {cube_path}: {e}")
+            self.index, self._hashes = FilterIndex(cube), hashes
+            self.revision += 1
+            return
+
+        if not self._map(key):
+            self.index, self._hashes = FilterIndex(cube), hashes
+            self.revision += 1
+            return
+        try:
+            tmp_path = f"{self._pointer_path()}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as pointer_file:
+                json.dump({"key": key, "files": self._files}, pointer_file)
+            os.replace(tmp_path, self._pointer_path())
+        except OSError as e:
+            print(f"Could not record the latest shared cube: {e}")
+        self._remove_superseded(key)
+
+    def ingest_frame(self, raw):
+        """
+        Validate rows and merge the new ones into the cube.
+
+        The merged cube is only held by this process until `refresh`
+        publishes it.
+
+        Args:
+            raw (pd.DataFrame): Rows as read from a CSV drop.
+
+        Returns:
+            tuple: (rows added, rows rejected by validation).
+        """
+        df, rejected = validate_rows(raw)
+        df['date'] = df['date'].astype(self.cube['date'].dtype)
+        df = prepare_frame(df)
+
+        hashes = row_hashes(df)
+        new = ~np.isin(hashes, self._hashes)
+        # Drop duplicates within the drop itself as well
+        new &= ~pd.Series(hashes).duplicated().to_numpy()
+        if not new.any():
+            return 0, rejected
+
+        self.index = FilterIndex(merge_cubes(self.cube, build_cube(df[new])))
+        self._hashes = np.union1d(self._hashes, hashes[new])
+        self.revision += 1
+        return int(new.sum()), rejected
+
+    def ingest_file(self, path):
+        """
+        Ingest one CSV drop.
+
+        Returns:
+            tuple: (rows added, rows rejected by validation).
+        """
+        return self.ingest_frame(pd.read_csv(path, delimiter=","))
+
+    def refresh(self, force=False):
+        """
+        Ingest drops that are new or changed since the last scan.
+
+        Scans are rate limited by `refresh_interval` unless `force` is set.
+        When another process already published the resulting state it is
+        mapped instead of being recomputed.
+
+        Returns:
+            FilterIndex: The index over the current cube.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_scan < self.refresh_interval:
+                return self.index
+            self._last_scan = now
+
+            current = drop_fingerprints(self.incoming_dir)
+            changed = [path for path, fingerprint in current.items() if self._files.get(path) != fingerprint]
+            if not changed:
+                return self.index
+
+            files = {**self._files, **current}
+            if self._map(self._state_key(files)):
+                self._files = files
+                return self.index
+
+            for path in changed:
+                try:
+                    added, rejected = self.ingest_file(path)
+                except (OSError, ValueError) as e:
+                    print(f"Skipping {path}: {e}")
+                else:
+                    print(f"Ingested {added} new rows from {path} ({rejected} rejected)")
+                self._files[path] = current[path]
+            self._publish(self.cube, self._hashes)
+            return self.index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate and ingest CSV drops into the fishery cube.")
+    parser.add_argument("--csv", default=CSV_PATH, help="base CSV file")
+    parser.add_argument("--incoming", default=INCOMING_DIR, help="directory of CSV drops")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    store = IncrementalStore(args.csv, args.incoming)
+    print(f"{len(store.cube)} cube cells after ingestion in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+def build_prompt(metrics):
+    """
+    Build the Gemini prompt from the metrics of the filtered data.
+
+    Args:
+        metrics (dict): Metrics as returned by `cube.metrics_data`.
+
+    Returns:
+        str: The prompt sent to the insight backend.
+    """
+    summary = f"""
+    The dataset contains {metrics['record_count']} records after applying filters.
+    The total production is {metrics['total_production']:,.2f} tonnes,
+    with a total value of {metrics['total_value']:,.2f} THB.
+    The average unit value is {metrics['average_unit_value']:,.2f} THB.
+    """
+    return f"Based on the following summary, generate insights and key takeaways:\n\n{summary}"
+
+
+def insight_key(metrics, filters):
+    """
+    Build a cache key from the summary values and the filter state.
+
+    Metrics are rounded to the precision shown in the prompt, so two states
+    that produce the same prompt share one cache entry.
+
+    Args:
+        metrics (dict): Metrics as returned by `cube.metrics_data`.
+        filters (dict): The dashboard filter selection.
+
+    Returns:
+        str: A stable hex digest.
+    """
+    normalized = {
+        "metrics": {name: round(float(value), 2) for name, value in sorted(metrics.items())},
+        "filters": {name: str(value) for name, value in sorted(filters.items())},
+    }
+    return hashlib.sha1(json.dumps(normalized, sort_keys=True).encode()).hexdigest()
+
+
+class InsightBackend:
+    """
+    Interface for anything that turns a prompt into insight text.
+    """
+
+    def generate(self, prompt):
+        raise NotImplementedError
+
+
+class GeminiBackend(InsightBackend):
+    """
+    Insight backend calling Google's Gemini model.
+
+    The SDK is imported and the model created on the first call, in the
+    insight worker thread, so creating the backend does not slow down
+    startup or the first render.
+    """
+
+    def __init__(self, api_key, model_name="gemini-2.0-flash"):
+        self.api_key = api_key
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        with self._lock:
+            if self._model is None:
+                # Imported here so the stub backend works without the Gemini SDK installed
+                import google.generativeai as genai
+
+                genai.configure(api_key=self.api_key)
+                self._model = genai.GenerativeModel(self.model_name)
+            return self._model
+
+    def generate(self, prompt):
+        response = self.model.generate_content(prompt)
+        return response.text.strip()
+
+
+class StubBackend(InsightBackend):
+    """
+    Deterministic offline backend for tests and benchmarks.
+
+    Args:
+        latency (float): Seconds to sleep per call, to mimic a remote model.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def generate(self, prompt):
+        if self.latency:
+            time.sleep(self.latency)
+        digest = hashlib.sha1(prompt.encode()).hexdigest()[:8]
+        return f"Stub insight {digest}: production and value trends are stable for the selected filters."
+
+
+class InsightCache:
+    """
+    Thread-safe LRU cache with a time-to-live per entry.
+
+    Args:
+        max_entries (int): Entries kept before the least recently used is evicted.
+        ttl (float): Seconds an entry stays valid.
+    """
+
+    def __init__(self, max_entries=256, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, text = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return text
+
+    def put(self, key, text):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), text)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class InsightService:
+    """
+    Generates insights in background threads and caches the results.
+
+    Concurrent requests for the same key share one in-flight generation.
+
+    Args:
+        backend (InsightBackend): The backend producing the text.
+        cache (InsightCache): Cache for finished insights; a new one if None.
+        max_workers (int): Number of concurrent backend calls.
+        failure_ttl (float): Seconds a failed generation is reported again
+            before the backend is retried.
+    """
+
+    def __init__(self, backend, cache=None, max_workers=4, failure_ttl=60):
+        self.backend = backend
+        self.cache = cache if cache is not None else InsightCache()
+        self._failures = InsightCache(ttl=failure_ttl)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="insights")
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def request(self, key, prompt):
+        """
+        Return a future for the insight text, starting generation if needed.
+
+        Args:
+            key (str): Cache key, see `insight_key`.
+            prompt (str): Prompt to send to the backend on a cache miss.
+
+        Returns:
+            Future: Resolves to the insight text; already done on a cache hit,
+            or failed while a recent generation for `key` failed.
+        """
+        text = self.cache.get(key)
+        if text is not None:
+            future = Future()
+            future.set_result(text)
+            return future
+        error = self._failures.get(key)
+        if error is not None:
+            future = Future()
+            future.set_exception(error)
+            return future
+
+        with self._lock:
+            future = self._pending.get(key)
+            if future is None:
+                future = self._executor.submit(self._generate, key, prompt)
+                self._pending[key] = future
+            return future
+
+    def _generate(self, key, prompt):
+        try:
+            text = self.backend.generate(prompt)
+            self.cache.put(key, text)
+            return text
+        except Exception as e:
+            self._failures.put(key, e)
+            raise
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
@@ -0,0 +1,220 @@
+"""
+Concurrent-session load test of the dashboard script.
+
+Usage:
+    python loadtest.py [--sessions N] [--reruns N] [--insight-latency S] [--think-time S] [--seed N] [--json PATH]
+
+Every session is a headless `AppTest` of `dashboard.py` running in its own
+thread, the way the Streamlit server runs one script thread per session,
+so the sessions share the process-wide caches. After the first run each
+session issues random filter changes, or opens and closes a lazy section,
+and the rerun latencies are timed.
+The report gives p50/p95/p99 rerun latency, throughput and the peak RSS of
+the process.
+
+Insights come from the stub backend with the given latency, so Gemini
+neither slows the numbers down nor needs network access.
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import random
+import resource
+import sys
+import threading
+import time
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+DASHBOARD = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dashboard.py")
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Seconds a single script run may take before AppTest gives up
+RUN_TIMEOUT = 300
+
+# Streamlit loggers silenced while the test runs
+QUIET_LOGGERS = [
+    "streamlit.deprecation_util",
+    "streamlit.runtime.scriptrunner_utils.script_run_context",
+    "streamlit.runtime.caching.cache_data_api",
+]
+
+# Shortest date range picked by a random date change
+MIN_RANGE_DAYS = 7
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process in MB.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def _widget(elements, label):
+    for element in elements:
+        if element.label == label:
+            return element
+    raise LookupError(f"No widget labelled {label!r}")
+
+
+def random_change(app, rng, date_span):
+    """
+    Apply one random filter change to an app, as a user would.
+
+    Args:
+        app (AppTest): A session that has already run once.
+        rng (random.Random): Source of randomness.
+        date_span (tuple): First and last date of the data.
+
+    Returns:
+        str: Description of the change.
+    """
+    action = rng.choice(["province", "type", "pieace", "resolution", "dates", "downsampling", "section"])
+    if action == "dates":
+        first, last = date_span
+        span = (last - first).days
+        start = first + datetime.timedelta(days=rng.randrange(max(span - MIN_RANGE_DAYS, 1)))
+        end = start + datetime.timedelta(days=rng.randrange(MIN_RANGE_DAYS, max(span, MIN_RANGE_DAYS + 1)))
+        _widget(app.date_input, "Start Date").set_value(start)
+        _widget(app.date_input, "End Date").set_value(min(end, last))
+        return f"dates {start}..{min(end, last)}"
+    if action == "downsampling":
+        checkbox = _widget(app.checkbox, "Shape-preserving downsampling (LTTB)")
+        checkbox.set_value(not checkbox.value)
+        return f"downsampling {checkbox.value}"
+    if action == "section":
+        toggle = rng.choice(list(app.toggle))
+        toggle.set_value(not toggle.value)
+        return f"{toggle.label} {toggle.value}"
+
+    label = {
+        "province": "Select Province",
+        "type": "Select Type",
+        "pieace": "Select Pieace",
+        "resolution": "Time Resolution",
+    }[action]
+    selectbox = _widget(app.selectbox, label)
+    option = rng.choice(selectbox.options)
+    selectbox.select(option)
+    return f"{action} {option}"
+
+
+def run_session(number, reruns, seed, think_time, results):
+    """
+    Drive one session: a first run, then `reruns` random filter changes.
+
+    Args:
+        number (int): Session number, also offsets the seed.
+        reruns (int): Filter changes to issue.
+        seed (int): Base random seed.
+        think_time (float): Seconds to wait between two changes.
+        results (dict): Collects `first_run` and `rerun` latencies and `errors`.
+    """
+    rng = random.Random(seed + number)
+    app = AppTest.from_file(DASHBOARD, default_timeout=RUN_TIMEOUT)
+
+    start = time.perf_counter()
+    app.run()
+    results["first_run"].append(time.perf_counter() - start)
+    if app.exception:
+        results["errors"].append(f"session {number} first run: {app.exception[0].message}")
+        return
+    date_span = (_widget(app.date_input, "Start Date").value, _widget(app.date_input, "End Date").value)
+
+    for _ in range(reruns):
+        if think_time:
+            time.sleep(think_time)
+        change = random_change(app, rng, date_span)
+        start = time.perf_counter()
+        app.run()
+        results["rerun"].append(time.perf_counter() - start)
+        if app.exception:
+            results["errors"].append(f"session {number} after {change}: {app.exception[0].message}")
+
+
+def load_test(sessions=8, reruns=20, insight_latency=0.5, think_time=0.0, seed=0):
+    """
+    Run concurrent sessions and summarize their latencies.
+
+    Args:
+        sessions (int): Concurrent sessions.
+        reruns (int): Filter changes per session.
+        insight_latency (float): Seconds the stub insight backend takes per call.
+        think_time (float): Seconds each session waits between two changes.
+        seed (int): Base random seed; the same seed replays the same changes.
+
+    Returns:
+        dict: Latency quantiles in seconds, throughput, peak RSS and errors.
+    """
+    os.environ["INSIGHT_BACKEND"] = "stub"
+    os.environ["INSIGHT_STUB_LATENCY"] = str(insight_latency)
+
+    results = {"first_run": [], "rerun": [], "errors": []}
+    threads = [
+        threading.Thread(target=run_session, args=(number, reruns, seed, think_time, results), name=f"session-{number}")
+        for number in range(sessions)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    summary = {
+        "sessions": sessions,
+        "reruns": len(results["rerun"]),
+        "elapsed_seconds": elapsed,
+        "throughput_reruns_per_second": len(results["rerun"]) / elapsed if elapsed else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "errors": results["errors"],
+    }
+    for name in ("first_run", "rerun"):
+        values = np.asarray(results[name], dtype="float64")
+        for quantile in QUANTILES:
+            summary[f"{name}_p{int(quantile * 100)}_seconds"] = float(np.quantile(values, quantile)) if len(values) else None
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the dashboard with concurrent headless sessions.")
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent sessions")
+    parser.add_argument("--reruns", type=int, default=20, help="random filter changes per session")
+    parser.add_argument("--insight-latency", type=float, default=0.5, help="seconds per stub insight call")
+    parser.add_argument("--think-time", type=float, default=0.0, help="seconds between two changes of a session")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--json", default=None, help="also write the summary to this JSON file")
+    args = parser.parse_args(argv)
+
+    # Deprecation and bare-mode notices logged by every session would drown the report
+    for name in QUIET_LOGGERS:
+        logging.getLogger(name).disabled = True
+
+    summary = load_test(args.sessions, args.reruns, args.insight_latency, args.think_time, args.seed)
+    print(f"{summary['sessions']} sessions, {summary['reruns']} reruns in {summary['elapsed_seconds']:.1f}s")
+    for name in ("first_run", "rerun"):
+        quantiles = ", ".join(
+            f"p{int(quantile * 100)} {summary[f'{name}_p{int(quantile * 100)}_seconds'] * 1000:,.0f} ms"
+            for quantile in QUANTILES
+            if summary[f"{name}_p{int(quantile * 100)}_seconds"] is not None
+        )
+        print(f"{name.replace('_', ' ').capitalize()} latency: {quantiles}")
+    print(f"Throughput: {summary['throughput_reruns_per_second']:.2f} reruns/s")
+    print(f"Peak RSS: {summary['peak_rss_mb']:,.1f} MB")
+    for error in summary["errors"]:
+        print(f"Error: {error}")
+
+    if args.json:
+        with open(args.json, "w") as json_file:
+            json.dump(summary, json_file, indent=4)
+    return 1 if summary["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+"""
+Precompute the dashboard artifacts for every filter combination.
+
+Usage:
+    python materialize.py [--csv PATH] [--incoming DIR] [--out-dir DIR] [--window all|START:END ...] [--workers N]
+
+Every observed province x type x pieace combination, including the "All"
+roll-ups the dashboard offers, is materialized for each date window as one
+JSON file holding the same documents as `export_artifacts.py`, computed
+from the dashboard's cube (the base CSV plus ingested drops). The cube is
+written once to an Arrow IPC file that every worker process memory-maps at
+start-up, so tasks only carry the filter values.
+
+A manifest in each window directory records the source CSV, column layout
+and artifact version its files were computed from. While they match,
+finished files are not recomputed, which makes an interrupted run
+resumable; otherwise the window's files are removed and computed again.
+"""
+import argparse
+import itertools
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from data_loader import CSV_PATH, map_arrow, write_arrow
+from export_artifacts import artifact_source, build_artifacts, write_json_atomic
+from filter_index import FILTER_COLUMNS, FilterIndex
+from ingest import INCOMING_DIR, IncrementalStore
+
+OUTPUT_DIR = os.path.join("data", "metrics_data", "combinations")
+
+CUBE_FILE = ".cube.arrow"
+
+# Per window directory: the `artifact_source` its files were computed from
+MANIFEST_NAME = ".materialize_manifest.json"
+
+# Indexed cube shared by the tasks of one worker process, set by `_init_worker`
+_worker_index = None
+
+
+def parse_window(window):
+    """
+    Parse a date window given as "all" or "START:END".
+
+    Returns:
+        tuple: (start_date, end_date), either of which may be None.
+    """
+    if window == "all":
+        return None, None
+    start, _, end = window.partition(":")
+    return start or None, end or None
+
+
+def _slug(value):
+    return re.sub(r"[^A-Za-z0-9]+", "-", str(value)).strip("-")
+
+
+def combination_path(out_dir, window, province, type_filter, pieace):
+    """
+    Return the output file of one filter combination.
+    """
+    name = "__".join(_slug(value) for value in (province, type_filter, pieace))
+    return os.path.join(out_dir, _slug(window), f"{name}.json")
+
+
+def filter_combinations(cube):
+    """
+    List every filter selection the dashboard can produce.
+
+    For each subset of the filter columns set to "All", the distinct
+    observed values of the remaining columns are combined.
+
+    Args:
+        cube (pd.DataFrame): The aggregated cube.
+
+    Returns:
+        list: (province, type, pieace) tuples.
+    """
+    cells = cube[FILTER_COLUMNS].drop_duplicates().astype(str)
+    combinations = set()
+    for keep in itertools.product([True, False], repeat=len(FILTER_COLUMNS)):
+        columns = [column for column, kept in zip(FILTER_COLUMNS, keep) if kept]
+        values = cells[columns].drop_duplicates().itertuples(index=False, name=None) if columns else [()]
+        for row in values:
+            row = iter(row)
+            combinations.add(tuple(next(row) if kept else "All" for kept in keep))
+    return sorted(combinations)
+
+
+def reset_stale_window(window_dir, source):
+    """
+    Remove the files of a window computed from another `artifact_source`.
+
+    Args:
+        window_dir (str): Output directory of one date window.
+        source (dict): Manifest of this run, holding its `artifact_source`.
+
+    Returns:
+        int: Number of files removed.
+    """
+    manifest_path = os.path.join(window_dir, MANIFEST_NAME)
+    try:
+        with open(manifest_path) as manifest_file:
+            if json.load(manifest_file) == source:
+                return 0
+    except (OSError, ValueError):
+        pass
+
+    removed = 0
+    for name in os.listdir(window_dir):
+        if name.endswith(".json") and name != MANIFEST_NAME:
+            os.remove(os.path.join(window_dir, name))
+            removed += 1
+    write_json_atomic(source, manifest_path)
+    return removed
+
+
+def _init_worker(cube_path):
+    global _worker_index
+    _worker_index = FilterIndex(map_arrow(cube_path))
+
+
+def _materialize(task):
+    out_dir, window, province, type_filter, pieace = task
+    start_date, end_date = parse_window(window)
+    selection = _worker_index.take(_worker_index.select(province, type_filter, pieace, start_date, end_date))
+    payload = {
+        "filters": {
+            "province": province,
+            "type": type_filter,
+            "pieace": pieace,
+            "start_date": start_date,
+            "end_date": end_date,
+        },
+        "artifacts": build_artifacts(selection),
+    }
+    path = combination_path(out_dir, window, province, type_filter, pieace)
+    write_json_atomic(payload, path, indent=None)
+    return path
+
+
+def materialize(
+    csv_path=CSV_PATH, out_dir=OUTPUT_DIR, windows=("all",), workers=None, report_every=100,
+    incoming_dir=INCOMING_DIR,
+):
+    """
+    Materialize every filter combination for every date window.
+
+    Args:
+        csv_path (str): Path to the source CSV file.
+        out_dir (str): Root directory of the per-combination files.
+        windows (list): Date windows, "all" or "START:END".
+        workers (int): Worker processes; defaults to the CPU count.
+        report_every (int): Print progress after this many combinations.
+        incoming_dir (str): Directory of CSV drops merged into the cube.
+
+    Returns:
+        dict: Counts of total, skipped and written combinations and the throughput.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    cube = IncrementalStore(csv_path, incoming_dir).cube
+    cube_path = os.path.join(out_dir, CUBE_FILE)
+    # Date-sorted, so every worker's FilterIndex uses the mapped pages as they are
+    write_arrow(cube.sort_values('date', kind="stable", ignore_index=True), cube_path)
+
+    combinations = filter_combinations(cube)
+    source = {"source": artifact_source(csv_path, incoming_dir)}
+    tasks = []
+    for window in windows:
+        window_dir = os.path.join(out_dir, _slug(window))
+        os.makedirs(window_dir, exist_ok=True)
+        removed = reset_stale_window(window_dir, source)
+        if removed:
+            print(f"Removed {removed} stale combinations of window {window}")
+        for province, type_filter, pieace in combinations:
+            if not os.path.exists(combination_path(out_dir, window, province, type_filter, pieace)):
+                tasks.append((out_dir, window, province, type_filter, pieace))
+
+    total = len(combinations) * len(windows)
+    print(f"{total} combinations, {total - len(tasks)} already materialized, {len(tasks)} to go")
+
+    start = time.perf_counter()
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(cube_path,)) as executor:
+        for future in as_completed([executor.submit(_materialize, task) for task in tasks]):
+            future.result()
+            done += 1
+            if done % report_every == 0:
+                elapsed = time.perf_counter() - start
+                print(f"{done}/{len(tasks)} combinations, {done / elapsed:,.1f} combinations/sec")
+    elapsed = time.perf_counter() - start
+
+    throughput = done / elapsed if elapsed else 0.0
+    print(f"Materialized {done} combinations in {elapsed:.2f}s ({throughput:,.1f} combinations/sec)")
+    return {"total": total, "skipped": total - len(tasks), "written": done, "combinations_per_sec": throughput}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Materialize dashboard artifacts for every filter combination.")
+    parser.add_argument("--csv", default=CSV_PATH, help="source CSV file")
+    parser.add_argument("--incoming", default=INCOMING_DIR, help="directory of CSV drops")
+    parser.add_argument("--out-dir", default=OUTPUT_DIR, help="directory to write the combinations to")
+    parser.add_argument(
+        "--window", action="append", dest="windows",
+        help='date window, "all" or "START:END" (repeatable; default: all)',
+    )
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+    materialize(
+        args.csv, args.out_dir, windows=args.windows or ["all"], workers=args.workers, incoming_dir=args.incoming,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+
+# Stage durations kept per stage for the quantiles
+MAX_SAMPLES = 1000
+
+QUANTILES = (0.5, 0.99)
+
+# Fallback origin of `process_uptime` where /proc is not available
+_IMPORTED_AT = time.perf_counter()
+
+
+class RerunProfile:
+    """
+    Timings, row counts and payload sizes of the stages of one rerun.
+
+    Args:
+        measure_payloads (bool): Whether callers should serialize chart specs
+            to record their size; this costs an extra serialization per chart.
+    """
+
+    def __init__(self, measure_payloads=False):
+        self.measure_payloads = measure_payloads
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.stages = []
+        self.finished = False
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        """
+        Time the enclosed block as stage `name`.
+
+        The yielded dict can be updated with `rows` or `payload_bytes`.
+        """
+        record = {"stage": name, "seconds": None, "rows": rows, "payload_bytes": None}
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = time.perf_counter() - start
+            self.stages.append(record)
+
+    def elapsed(self):
+        """
+        Seconds since the profile was created.
+        """
+        return time.perf_counter() - self._start
+
+    def record(self, name, seconds, rows=None):
+        """
+        Record a duration measured elsewhere as stage `name`.
+        """
+        self.stages.append({"stage": name, "seconds": seconds, "rows": rows, "payload_bytes": None})
+
+    def finish(self, name="rerun"):
+        """
+        Record the whole rerun, from creation until now, as stage `name`.
+        """
+        self.record(name, self.elapsed())
+        self.finished = True
+
+    def to_jsonl(self):
+        """
+        Render the stages as JSON lines, one object per stage.
+        """
+        return "".join(
+            json.dumps({"timestamp": self.started_at, **record}) + "\n" for record in self.stages
+        )
+
+
+def stage(profile, name, rows=None):
+    """
+    `profile.stage(name)`, or a no-op context when `profile` is None.
+    """
+    if profile is None:
+        return nullcontext({})
+    return profile.stage(name, rows=rows)
+
+
+def process_uptime():
+    """
+    Seconds since this process started.
+
+    Read from `/proc` on Linux, so the time spent importing modules before
+    any of our code ran is included. Elsewhere the time since this module
+    was imported is returned instead.
+    """
+    try:
+        with open("/proc/self/stat") as stat_file:
+            # Fields after the command name, which may contain spaces; starttime is field 22
+            fields = stat_file.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as uptime_file:
+            uptime = float(uptime_file.read().split()[0])
+        return uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK")
+    except (OSError, IndexError, ValueError):
+        return time.perf_counter() - _IMPORTED_AT
+
+
+class StartupTimer:
+    """
+    Seconds from process start to named milestones, each recorded once.
+    """
+
+    def __init__(self):
+        self.milestones = {}
+        self._lock = threading.Lock()
+
+    def mark(self, name):
+        """
+        Record milestone `name` now, unless it was already recorded.
+
+        Returns:
+            float: Seconds since the process started, or None if already recorded.
+        """
+        with self._lock:
+            if name in self.milestones:
+                return None
+            self.milestones[name] = process_uptime()
+            return self.milestones[name]
+
+
+class ProfileHistory:
+    """
+    Process-wide history of stage durations across reruns and sessions.
+
+    Args:
+        max_samples (int): Durations kept per stage.
+    """
+
+    def __init__(self, max_samples=MAX_SAMPLES):
+        self._samples = defaultdict(lambda: deque(maxlen=max_samples))
+        self._totals = defaultdict(lambda: [0, 0.0])
+        self._lock = threading.Lock()
+
+    def add(self, profile):
+        with self._lock:
+            for record in profile.stages:
+                self._samples[record["stage"]].append(record["seconds"])
+                totals = self._totals[record["stage"]]
+                totals[0] += 1
+                totals[1] += record["seconds"]
+
+    def summary(self):
+        """
+        Return count and p50/p99 seconds per stage.
+
+        Returns:
+            list: One dict per stage, in order of first appearance.
+        """
+        with self._lock:
+            samples = {name: np.fromiter(values, dtype="float64") for name, values in self._samples.items()}
+            totals = {name: tuple(values) for name, values in self._totals.items()}
+        rows = []
+        for name, values in samples.items():
+            row = {"stage": name, "count": totals[name][0], "sum_seconds": totals[name][1]}
+            for quantile in QUANTILES:
+                row[f"p{int(quantile * 100)}_seconds"] = float(np.quantile(values, quantile))
+            rows.append(row)
+        return rows
+
+    def to_prometheus(self):
+        """
+        Render the history in the Prometheus text exposition format.
+        """
+        lines = [
+            "# HELP dashboard_stage_seconds Duration of a dashboard rerun stage.",
+            "# TYPE dashboard_stage_seconds summary",
+        ]
+        for row in self.summary():
+            label = row["stage"].replace("\\", "\\\\").replace('"', '\\"')
+            for quantile in QUANTILES:
+                value = row[f"p{int(quantile * 100)}_seconds"]
+                lines.append(f'dashboard_stage_seconds{{stage="{label}",quantile="{quantile}"}} {value:.6f}')
+            lines.append(f'dashboard_stage_seconds_sum{{stage="{label}"}} {row["sum_seconds"]:.6f}')
+            lines.append(f'dashboard_stage_seconds_count{{stage="{label}"}} {row["count"]}')
+        return "\n".join(lines) + "\n"
+
+
+def append_jsonl(profile, path):
+    """
+    Append the stages of a rerun to a JSON lines file.
+    """
+    with open(path, "a") as log_file:
+        log_file.write(profile.to_jsonl())
+
+
+def write_prometheus(history, path):
+    """
+    Atomically write the history for a Prometheus textfile collector.
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as metrics_file:
+        metrics_file.write(history.to_prometheus())
+    os.replace(tmp_path, path)
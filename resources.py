@@ -0,0 +1,161 @@
+"""
+Process-wide resources of the dashboard, shared by every session.
+
+They live in their own module so that both `dashboard.py` and the server
+launcher (`server.py`) reach the same `st.cache_resource` entries: the
+launcher warms them when the server starts, before the first session.
+"""
+import os
+
+import streamlit as st
+
+from backends import DEFAULT_BACKEND, get_backend
+from data_loader import CSV_PATH, source_fingerprint
+from geo import GEOJSON_PATH, SEATS_PATH, geometry_fingerprint, load_province_seats, load_provinces
+from ingest import IncrementalStore
+from insights import GeminiBackend, InsightService, StubBackend
+from profiler import ProfileHistory, RerunProfile, StartupTimer
+
+# Environment variable, or `st.secrets` entry, holding the Gemini API key
+GEMINI_API_KEY_NAME = "GEMINI_API_KEY"
+
+
+@st.cache_resource(show_spinner=False)
+def get_profile_history():
+    """
+    Create the stage timing history shared by all sessions.
+
+    Returns:
+        ProfileHistory: Recent durations per stage, for p50/p99.
+    """
+    return ProfileHistory()
+
+
+@st.cache_resource(show_spinner=False)
+def get_startup_timer():
+    """
+    Create the startup milestones of this server process.
+
+    Returns:
+        StartupTimer: Seconds from process start to each milestone.
+    """
+    return StartupTimer()
+
+
+@st.cache_resource(show_spinner=False)
+def get_store(fingerprint):
+    """
+    Load the fishery cube once per source version, shared by all sessions.
+
+    CSV drops in `data/incoming` are merged into the same store as they arrive.
+
+    Args:
+        fingerprint (str): Fingerprint of the source CSV; a new value invalidates the cache.
+
+    Returns:
+        IncrementalStore: The cube of the base CSV plus every ingested drop.
+    """
+    return IncrementalStore(CSV_PATH)
+
+
+@st.cache_resource(show_spinner=False)
+def get_province_shapes(path, fingerprint):
+    """
+    Load the simplified province outlines once per file version.
+
+    Args:
+        path (str): Source GeoJSON, see `geo.GEOJSON_PATH`.
+        fingerprint (str): Fingerprint of the file, None while it is missing;
+            a new value invalidates the cache.
+
+    Returns:
+        list or None: Province features, or None without a boundary file.
+    """
+    return load_provinces(path)
+
+
+def gemini_api_key():
+    """
+    Read the Gemini API key from the environment, then from `st.secrets`.
+
+    Returns:
+        str or None: The key, or None to let the SDK fall back to
+        `GOOGLE_API_KEY` or the service account when running on GCP.
+    """
+    key = os.environ.get(GEMINI_API_KEY_NAME)
+    if key:
+        return key
+    try:
+        return st.secrets.get(GEMINI_API_KEY_NAME)
+    except FileNotFoundError:
+        # No secrets.toml at all
+        return None
+
+
+@st.cache_resource(show_spinner=False)
+def get_province_seats(path=SEATS_PATH):
+    """
+    Load the provincial seats the map falls back to without boundaries.
+
+    Returns:
+        pd.DataFrame: Seat locations, see `geo.load_province_seats`.
+    """
+    return load_province_seats(path)
+
+
+@st.cache_resource(show_spinner=False)
+def get_insight_service():
+    """
+    Create the insight service shared by all sessions.
+
+    Set `INSIGHT_BACKEND=stub` (and optionally `INSIGHT_STUB_LATENCY`) to
+    run without calling Gemini. The Gemini API key is read by
+    `gemini_api_key`; the client is only imported and configured once the
+    first insight is generated.
+
+    Returns:
+        InsightService: Background generator with an LRU/TTL cache.
+    """
+    if os.environ.get("INSIGHT_BACKEND") == "stub":
+        backend = StubBackend(latency=float(os.environ.get("INSIGHT_STUB_LATENCY", "0")))
+    else:
+        backend = GeminiBackend(api_key=gemini_api_key())
+    return InsightService(backend)
+
+
+@st.cache_resource(show_spinner=False)
+def get_query_backend(name):
+    """
+    Create the query backend shared by all sessions.
+
+    Set `QUERY_BACKEND` to `duckdb` or `polars` to aggregate on those engines.
+
+    Returns:
+        QueryBackend: The backend running the chart and metric aggregations.
+    """
+    return get_backend(name)
+
+
+def warm_up():
+    """
+    Load the data and create the shared resources ahead of the first session.
+
+    Meant to run in a background thread when the server starts; a session
+    arriving meanwhile waits on the same cache entries instead of loading
+    the data a second time.
+    """
+    profile = RerunProfile()
+    with profile.stage("warm_up:load") as record:
+        record["rows"] = len(get_store(source_fingerprint(CSV_PATH)).refresh())
+    with profile.stage("warm_up:geometry"):
+        if get_province_shapes(GEOJSON_PATH, geometry_fingerprint(GEOJSON_PATH)) is None:
+            get_province_seats()
+    with profile.stage("warm_up:services"):
+        get_insight_service()
+        get_query_backend(os.environ.get("QUERY_BACKEND", DEFAULT_BACKEND))
+
+    seconds = get_startup_timer().mark("data_ready")
+    if seconds is not None:
+        profile.record("startup:data_ready", seconds)
+        print(f"Data ready {seconds:.2f}s after the server process started")
+    get_profile_history().add(profile)
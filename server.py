@@ -0,0 +1,27 @@
+"""
+Serve the dashboard with the data cache warmed at server start.
+
+Usage:
+    streamlit run server.py
+
+The data is loaded in a background thread as soon as the server starts,
+so the first session finds the cube in cache instead of loading it before
+its first chart. `streamlit run dashboard.py` still works, but then the
+data is only loaded once the first session arrives.
+"""
+import threading
+from contextlib import asynccontextmanager
+
+import streamlit as st
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Imported here, once the runtime is up, so the resources share the sessions' caches
+    from resources import warm_up
+
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    yield
+
+
+app = st.App("dashboard.py", lifespan=lifespan)
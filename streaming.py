@@ -0,0 +1,126 @@
+"""
+Out-of-core aggregation for source files larger than memory.
+
+Usage:
+    python streaming.py [--csv PATH] [--memory-limit-mb N]
+
+The CSV is read in chunks sized from a memory ceiling. Each chunk is
+converted exactly like `data_loader.parse_csv` and reduced to a partial
+cube; partial cubes are folded together whenever they outgrow their share
+of the budget. The resulting cube is the one the in-memory path builds, so
+every metric and chart (sums, means, top-5 provinces, monthly top-3) comes
+out the same.
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from cube import build_cube, chart_data, combine_cubes, metrics_data
+from data_loader import CATEGORY_COLUMNS, CSV_PATH, STORED_COLUMNS, prepare_frame
+
+MEMORY_LIMIT_MB = 512
+
+# Rows read up front to estimate the in-memory size of a row
+SAMPLE_ROWS = 1000
+
+# Parsing holds the raw text, the parsed chunk and its converted copy at once
+PARSE_OVERHEAD = 3
+
+# Share of the budget given to the chunk being parsed; the rest holds partial cubes
+CHUNK_SHARE = 0.5
+
+
+def _read_options():
+    return {
+        "delimiter": ",",
+        "usecols": STORED_COLUMNS,
+        "dtype": {column: "category" for column in CATEGORY_COLUMNS},
+        "parse_dates": ["date"],
+    }
+
+
+def estimate_chunk_rows(csv_path, memory_limit_mb=MEMORY_LIMIT_MB):
+    """
+    Pick a chunk size that keeps one parsed chunk within its share of the budget.
+
+    Args:
+        csv_path (str): Path to the source CSV file.
+        memory_limit_mb (float): Memory ceiling for the whole aggregation.
+
+    Returns:
+        int: Rows per chunk.
+    """
+    sample = prepare_frame(pd.read_csv(csv_path, nrows=SAMPLE_ROWS, **_read_options()))
+    if sample.empty:
+        return SAMPLE_ROWS
+    bytes_per_row = sample.memory_usage(deep=True).sum() / len(sample) * PARSE_OVERHEAD
+    return max(SAMPLE_ROWS, int(memory_limit_mb * 2**20 * CHUNK_SHARE / bytes_per_row))
+
+
+def stream_cube(csv_path=CSV_PATH, memory_limit_mb=MEMORY_LIMIT_MB, chunk_rows=None, on_chunk=None):
+    """
+    Build the cube of a CSV without ever loading the whole file.
+
+    Args:
+        csv_path (str): Path to the source CSV file.
+        memory_limit_mb (float): Memory ceiling for chunks plus partial cubes.
+        chunk_rows (int): Rows per chunk; estimated from the ceiling if None.
+        on_chunk (callable): Called with every converted chunk, e.g. to
+            collect row hashes alongside the cube.
+
+    Returns:
+        pd.DataFrame: The aggregated cube, see `cube.build_cube`.
+
+    Raises:
+        MemoryError: If the distinct cells alone do not fit in the ceiling.
+    """
+    chunk_rows = chunk_rows or estimate_chunk_rows(csv_path, memory_limit_mb)
+    cube_budget = memory_limit_mb * 2**20 * (1 - CHUNK_SHARE)
+
+    partials = []
+    partial_bytes = 0
+    with pd.read_csv(csv_path, chunksize=chunk_rows, **_read_options()) as reader:
+        for chunk in reader:
+            chunk = prepare_frame(chunk)
+            if on_chunk is not None:
+                on_chunk(chunk)
+            partial = build_cube(chunk)
+            partials.append(partial)
+            partial_bytes += partial.memory_usage(deep=True).sum()
+            if partial_bytes > cube_budget:
+                partials = [combine_cubes(partials)]
+                partial_bytes = partials[0].memory_usage(deep=True).sum()
+                if partial_bytes > cube_budget:
+                    raise MemoryError(
+                        f"{len(partials[0])} distinct cells need {partial_bytes / 2**20:,.1f} MB, "
+                        f"more than the {cube_budget / 2**20:,.1f} MB cube budget"
+                    )
+
+    if not partials:
+        return build_cube(prepare_frame(pd.read_csv(csv_path, nrows=0, **_read_options())))
+    return combine_cubes(partials) if len(partials) > 1 else partials[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Aggregate a fishery CSV in bounded memory.")
+    parser.add_argument("--csv", default=CSV_PATH, help="source CSV file")
+    parser.add_argument("--memory-limit-mb", type=float, default=MEMORY_LIMIT_MB, help="memory ceiling in MB")
+    parser.add_argument("--chunk-rows", type=int, default=None, help="rows per chunk (default: from the ceiling)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    cube = stream_cube(args.csv, args.memory_limit_mb, args.chunk_rows)
+    metrics = metrics_data(cube)
+    charts = chart_data(cube)
+    print(f"Aggregated {metrics['record_count']} records into {len(cube)} cells in {time.perf_counter() - start:.2f}s")
+    print(f"Total Production (Tonnes): {metrics['total_production']:,.2f}")
+    print(f"Total Value (THB): {metrics['total_value']:,.2f}")
+    print(f"Average Unit Value (THB): {metrics['average_unit_value']:,.2f}")
+    print(f"Total Employment: {metrics['total_employment']:,.0f}")
+    print("Top 5 Provinces by Production:")
+    print(charts['top_production_provinces'].to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Synthetic fishery data at any scale, with the schema of the sample CSV.
+
+Usage:
+    python synthetic_data.py --rows N [--out PATH] [--seed N] [--reference PATH]
+
+Rows are drawn from the sample CSV: provinces and (type, pieaces) pairs
+follow their sample frequencies, dates are uniform over the sample's date
+span, and the base measures of a bootstrapped sample row are jittered. The
+derived columns are then recomputed from the base measures, so the data
+keeps the cardinalities and the relationships of the real data at any size.
+The file is written in chunks, so the row count is not limited by memory.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+
+from data_loader import CSV_PATH, SOURCE_COLUMNS
+
+# Rows generated and written per chunk
+CHUNK_ROWS = 1_000_000
+
+# Measures drawn from the sample and jittered; the other numeric columns derive from them
+BASE_MEASURES = [
+    "total_quant_of_product",
+    "total_value_product",
+    "total_emp",
+    "export_value",
+    "import_value",
+    "total_quant_species",
+]
+
+# Standard deviation of the log-normal jitter applied to the base measures
+JITTER = 0.1
+
+
+def reference_profile(reference=CSV_PATH):
+    """
+    Collect the distributions the generator samples from.
+
+    Args:
+        reference (str): Path to a CSV with the fishery schema.
+
+    Returns:
+        dict: Province and (type, pieaces) frequencies, the date span and the base measures.
+    """
+    sample = pd.read_csv(reference, delimiter=",", parse_dates=["date"])
+    provinces = sample['province'].value_counts(normalize=True)
+    pairs = sample.groupby(['type', 'pieaces']).size()
+    measures = sample[BASE_MEASURES].to_numpy(dtype="float64")
+    return {
+        "provinces": provinces.index.to_numpy(),
+        "province_weights": provinces.to_numpy(),
+        "types": pairs.index.get_level_values('type').to_numpy(),
+        "pieaces": pairs.index.get_level_values('pieaces').to_numpy(),
+        "pair_weights": (pairs / pairs.sum()).to_numpy(),
+        "start_date": sample['date'].min(),
+        "days": (sample['date'].max() - sample['date'].min()).days + 1,
+        "measures": measures,
+        "integral": [
+            measure for measure, integral in zip(BASE_MEASURES, np.all(measures == np.round(measures), axis=0))
+            if integral
+        ],
+        "mean_quant": measures[:, 0].mean(),
+        "mean_value": measures[:, 1].mean(),
+    }
+
+
+def generate_chunk(profile, rows, rng, total_rows=None):
+    """
+    Generate rows with the schema of the source CSV.
+
+    Args:
+        profile (dict): Distributions, see `reference_profile`.
+        rows (int): Number of rows to generate.
+        rng (np.random.Generator): Source of randomness.
+        total_rows (int): Size of the whole dataset, the base of the percent shares;
+            `rows` if None.
+
+    Returns:
+        pd.DataFrame: The rows, columns in `SOURCE_COLUMNS` order.
+    """
+    total_rows = total_rows or rows
+    pairs = rng.choice(len(profile["pair_weights"]), size=rows, p=profile["pair_weights"])
+    measures = profile["measures"][rng.integers(0, len(profile["measures"]), size=rows)]
+    measures = measures * rng.lognormal(0.0, JITTER, size=measures.shape)
+    integral = np.isin(BASE_MEASURES, profile["integral"])
+    measures[:, integral] = np.maximum(np.round(measures[:, integral]), 1)
+    quant, value, emp, export, imports, species = measures.T
+
+    return pd.DataFrame({
+        "total_quant_of_product": quant,
+        "total_value_product": value,
+        "pieaces": profile["pieaces"][pairs],
+        "total_emp": emp,
+        "export_value": export,
+        "import_value": imports,
+        "date": profile["start_date"] + pd.to_timedelta(rng.integers(0, profile["days"], size=rows), unit="D"),
+        "total_quant_species": species,
+        "province": rng.choice(profile["provinces"], size=rows, p=profile["province_weights"]),
+        "type": profile["types"][pairs],
+        "unit_value": value / quant,
+        "production_per_worker": quant / emp,
+        "value_per_worker": value / emp,
+        "percent_share_of_total_production": 100 * quant / (profile["mean_quant"] * total_rows),
+        "percent_share_of_total_value": 100 * value / (profile["mean_value"] * total_rows),
+        "net_trade_value": export - imports,
+    })[SOURCE_COLUMNS]
+
+
+def _csv_table(chunk, integral):
+    """
+    Convert a chunk for the Arrow CSV writer, keeping the sample's spelling.
+
+    Dates are written without a time, and integral measures as `123.0` so
+    they parse back as floats like the sample's columns.
+    """
+    table = pa.Table.from_pandas(chunk, preserve_index=False)
+    table = table.set_column(table.schema.get_field_index('date'), 'date', table['date'].cast(pa.date32()))
+    for column in integral:
+        position = table.schema.get_field_index(column)
+        spelled = pc.binary_join_element_wise(pc.cast(pc.cast(table[column], pa.int64()), pa.string()), ".0", "")
+        table = table.set_column(position, column, spelled)
+    return table
+
+
+def generate_csv(path, rows, seed=0, reference=CSV_PATH, chunk_rows=CHUNK_ROWS):
+    """
+    Write a synthetic CSV of `rows` rows, chunk by chunk.
+
+    The same seed, reference and chunk size always produce the same file.
+
+    Args:
+        path (str): Destination path; replaced atomically.
+        rows (int): Number of rows.
+        seed (int): Seed of the random generator.
+        reference (str): CSV whose distributions are reproduced.
+        chunk_rows (int): Rows generated per chunk.
+
+    Returns:
+        str: The path written.
+    """
+    profile = reference_profile(reference)
+    # The net trade of integral exports and imports is integral as well
+    integral = profile["integral"] + (
+        ["net_trade_value"] if {"export_value", "import_value"} <= set(profile["integral"]) else []
+    )
+    rng = np.random.default_rng(seed)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    options = pa_csv.WriteOptions(include_header=False, quoting_style="none")
+    with pa.OSFile(tmp_path, "wb") as sink:
+        sink.write((",".join(SOURCE_COLUMNS) + "\n").encode())
+        for start in range(0, rows, chunk_rows):
+            chunk = generate_chunk(profile, min(chunk_rows, rows - start), rng, total_rows=rows)
+            pa_csv.write_csv(_csv_table(chunk, integral), sink, options)
+    os.replace(tmp_path, path)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic fishery data.")
+    parser.add_argument("--rows", type=int, required=True, help="number of rows")
+    parser.add_argument("--out", default=None, help="output CSV (default: data/synthetic/fishery_<rows>.csv)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--reference", default=CSV_PATH, help="CSV whose distributions are reproduced")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="rows generated per chunk")
+    args = parser.parse_args(argv)
+
+    path = args.out or os.path.join("data", "synthetic", f"fishery_{args.rows}.csv")
+    start = time.perf_counter()
+    generate_csv(path, args.rows, seed=args.seed, reference=args.reference, chunk_rows=args.chunk_rows)
+    print(f"Wrote {args.rows:,} rows to {path} in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()